@@ -0,0 +1,374 @@
+"""Local stand-ins for the Notion, Gemini and Telegram APIs.
+
+Each fake answers just enough of its API for the bot's real services to work
+against it, with configurable latency, rate limit and failure rate.
+"""
+import asyncio
+import itertools
+import json
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+from src.utils.rate_limiter import TokenBucket
+
+def task_page_id(database_id, number):
+    """Deterministic page id of the generated task `number` in a fake database"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{database_id}/{number}"))
+
+def _now_iso():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:00.000Z")
+
+class FakeService:
+    """Latency, rate limiting and failure injection shared by every fake"""
+
+    def __init__(self, latency=0.0, jitter=0.0, rate_limit=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.bucket = TokenBucket(rate_limit, max(rate_limit, 1)) if rate_limit else None
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "rate_limited": 0, "failed": 0}
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        self.stats["requests"] += 1
+        if self.bucket is not None:
+            now = time.monotonic()
+            if self.bucket.delay(now):
+                self.stats["rate_limited"] += 1
+                return self.rate_limited_response()
+            self.bucket.take(now)
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.failure_rate and self.random.random() < self.failure_rate:
+            self.stats["failed"] += 1
+            return web.json_response({"error": "injected failure"}, status=500)
+        return await handler(request)
+
+    def rate_limited_response(self):
+        return web.json_response({"error": "rate limited"}, status=429, headers={"Retry-After": "1"})
+
+    def routes(self, app):
+        raise NotImplementedError
+
+    def build_app(self):
+        app = web.Application(middlewares=[self.middleware])
+        self.routes(app)
+        return app
+
+class FakeNotion(FakeService):
+    """Notion databases, each filled with `tasks` generated pending tasks on first use.
+
+    With `create_missing`, pages that don't exist are made up on first access
+    instead of answering 404, so recorded button taps can be replayed.
+    """
+
+    def __init__(self, tasks=200, create_missing=False, **kwargs):
+        super().__init__(**kwargs)
+        self.task_count = tasks
+        self.create_missing = create_missing
+        self.databases = {}  # database id -> {page id: page}
+        self.pages = {}  # page id -> (database id, page)
+        self.next_number = {}
+
+    def rate_limited_response(self):
+        return web.json_response(
+            {"object": "error", "status": 429, "code": "rate_limited", "message": "Rate limited"},
+            status=429, headers={"Retry-After": "1"},
+        )
+
+    def routes(self, app):
+        app.router.add_get("/databases/{database_id}", self.database)
+        app.router.add_post("/databases/{database_id}/query", self.query)
+        app.router.add_post("/pages", self.create)
+        app.router.add_get("/pages/{page_id}", self.retrieve)
+        app.router.add_patch("/pages/{page_id}", self.update)
+
+    def _database(self, database_id):
+        pages = self.databases.get(database_id)
+        if pages is None:
+            pages = self.databases[database_id] = {}
+            for number in range(1, self.task_count + 1):
+                self._add(database_id, self._page(
+                    task_page_id(database_id, number), number, f"Task {number}",
+                    "Pending", ("Low", "Medium", "High")[number % 3], None,
+                ))
+            self.next_number[database_id] = self.task_count + 1
+        return pages
+
+    def _add(self, database_id, page):
+        self.databases[database_id][page["id"]] = page
+        self.pages[page["id"]] = (database_id, page)
+
+    def _page(self, page_id, number, title, status, priority, due_date):
+        return {
+            "object": "page",
+            "id": page_id,
+            "archived": False,
+            "last_edited_time": _now_iso(),
+            "properties": {
+                "Name": {"title": [{"text": {"content": title}, "plain_text": title}]},
+                "Status": {"select": {"name": status}},
+                "Priority": {"select": {"name": priority}},
+                "Due Date": {"date": {"start": due_date} if due_date else None},
+                "ID": {"unique_id": {"prefix": "T", "number": number}},
+            },
+        }
+
+    def _matches(self, page, filter):
+        if not filter:
+            return True
+        props = page["properties"]
+        if "and" in filter:
+            return all(self._matches(page, part) for part in filter["and"])
+        if filter.get("timestamp") == "last_edited_time":
+            return page["last_edited_time"] >= filter["last_edited_time"]["on_or_after"]
+        prop = props.get(filter.get("property")) or {}
+        if "select" in filter:
+            value = (prop.get("select") or {}).get("name")
+            condition = filter["select"]
+            if "equals" in condition:
+                return value == condition["equals"]
+            return value != condition.get("does_not_equal")
+        if "title" in filter:
+            title = "".join(t.get("plain_text", "") for t in prop.get("title") or [])
+            return filter["title"]["contains"].lower() in title.lower()
+        if "date" in filter:
+            start = (prop.get("date") or {}).get("start")
+            condition = filter["date"]
+            if condition.get("is_empty"):
+                return start is None
+            if start is None:
+                return False
+            if "equals" in condition:
+                return start[:10] == condition["equals"]
+            if "before" in condition:
+                return start[:10] < condition["before"]
+            return start[:10] <= condition["on_or_before"]
+        if "unique_id" in filter:
+            return (prop.get("unique_id") or {}).get("number") == filter["unique_id"]["equals"]
+        return True
+
+    async def database(self, request):
+        database_id = request.match_info["database_id"]
+        self._database(database_id)
+        return web.json_response({
+            "object": "database",
+            "id": database_id,
+            "title": [{"plain_text": "Tasks"}],
+            "properties": {
+                "Name": {"type": "title", "title": {}},
+                "Status": {"type": "select", "select": {}},
+                "Priority": {"type": "select", "select": {}},
+                "Due Date": {"type": "date", "date": {}},
+                "ID": {"type": "unique_id", "unique_id": {"prefix": "T"}},
+            },
+        })
+
+    async def query(self, request):
+        body = await request.json()
+        pages = [p for p in self._database(request.match_info["database_id"]).values()
+                 if self._matches(p, body.get("filter"))]
+        for sort in reversed(body.get("sorts") or []):
+            name = sort.get("property")
+
+            def key(page, name=name):
+                prop = page["properties"].get(name) or {}
+                value = (prop.get("date") or {}).get("start") or (prop.get("select") or {}).get("name")
+                return (value is None, value or "")
+
+            pages.sort(key=key, reverse=sort.get("direction") == "descending")
+
+        start = int(body.get("start_cursor") or 0)
+        size = min(int(body.get("page_size") or 100), 100)
+        results = pages[start:start + size]
+        has_more = start + size < len(pages)
+        return web.json_response({
+            "object": "list",
+            "results": results,
+            "has_more": has_more,
+            "next_cursor": str(start + size) if has_more else None,
+        })
+
+    def _lookup(self, page_id):
+        entry = self.pages.get(page_id)
+        if entry is None and self.create_missing:
+            database_id = "missing-pages"
+            if database_id not in self.databases:
+                self.databases[database_id] = {}
+                self.next_number[database_id] = 1
+            number = self.next_number[database_id]
+            self.next_number[database_id] += 1
+            self._add(database_id, self._page(page_id, number, f"Task {number}", "Pending", "Medium", None))
+            entry = self.pages[page_id]
+        return entry
+
+    async def retrieve(self, request):
+        entry = self._lookup(request.match_info["page_id"])
+        if entry is None:
+            return web.json_response({"object": "error", "status": 404, "code": "object_not_found"}, status=404)
+        return web.json_response(entry[1])
+
+    async def update(self, request):
+        entry = self._lookup(request.match_info["page_id"])
+        if entry is None:
+            return web.json_response({"object": "error", "status": 404, "code": "object_not_found"}, status=404)
+        database_id, page = entry
+        body = await request.json()
+        for name, value in (body.get("properties") or {}).items():
+            if "title" in value:
+                for item in value["title"]:
+                    item.setdefault("plain_text", item.get("text", {}).get("content", ""))
+            page["properties"][name] = value
+        if body.get("archived"):
+            page["archived"] = True
+            self.databases[database_id].pop(page["id"], None)
+        page["last_edited_time"] = _now_iso()
+        return web.json_response(page)
+
+    async def create(self, request):
+        body = await request.json()
+        database_id = body["parent"]["database_id"]
+        self._database(database_id)
+        number = self.next_number[database_id]
+        self.next_number[database_id] += 1
+        props = body.get("properties") or {}
+        title = "".join(t.get("text", {}).get("content", "") for t in props.get("Name", {}).get("title", []))
+        page = self._page(
+            task_page_id(database_id, number), number, title,
+            (props.get("Status", {}).get("select") or {}).get("name", "Pending"),
+            (props.get("Priority", {}).get("select") or {}).get("name", "Medium"),
+            ((props.get("Due Date") or {}).get("date") or {}).get("start"),
+        )
+        self._add(database_id, page)
+        return web.json_response(page)
+
+def interpret(text):
+    """The fake model's understanding of a message: a few keyword rules"""
+    commands = []
+    for part in re.split(r"\s+and\s+", text.strip()):
+        lowered = part.lower()
+        if re.search(r"\b(what|show|list)\b", lowered):
+            commands.append({"intent": "read", "data": {}})
+        elif lowered.startswith(("finish ", "complete ")):
+            commands.append({"intent": "update", "data": {"target_task_name": part.split(" ", 1)[1], "status": "Done"}})
+        elif lowered.startswith(("drop ", "remove ")):
+            commands.append({"intent": "delete", "data": {"target_task_name": part.split(" ", 1)[1]}})
+        else:
+            title = re.sub(r"^(please\s+)?(remind me to|remember to)\s+", "", part, flags=re.I)
+            commands.append({"intent": "create", "data": {"title": title, "priority": "Medium"}})
+    return {"commands": commands}
+
+class FakeGemini(FakeService):
+    """generateContent endpoint answering with commands from `interpret`"""
+
+    def rate_limited_response(self):
+        return web.json_response(
+            {"error": {"code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}},
+            status=429,
+        )
+
+    def routes(self, app):
+        app.router.add_get("/{version}/models/{model}", self.model)
+        app.router.add_post("/{version}/models/{action}", self.generate)
+
+    async def model(self, request):
+        name = request.match_info["model"]
+        return web.json_response({"name": f"models/{name}", "displayName": name})
+
+    async def generate(self, request):
+        body = await request.json()
+        prompt = "".join(part.get("text", "") for c in body.get("contents", []) for part in c.get("parts", []))
+        user_text = prompt.rsplit("User input:", 1)[-1].strip()
+        return web.json_response({
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": json.dumps(interpret(user_text))}]},
+                "finishReason": "STOP",
+            }],
+        })
+
+class FakeTelegram(FakeService):
+    """Bot API methods the bot calls, answering like Telegram would"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.message_ids = itertools.count(1_000_000)
+        self.methods = {}
+
+    def rate_limited_response(self):
+        return web.json_response({
+            "ok": False, "error_code": 429,
+            "description": "Too Many Requests: retry after 1", "parameters": {"retry_after": 1},
+        }, status=429)
+
+    def routes(self, app):
+        app.router.add_post("/bot{token}/{method}", self.call)
+
+    async def call(self, request):
+        method = request.match_info["method"]
+        self.methods[method] = self.methods.get(method, 0) + 1
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+
+        if method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        elif method in ("sendMessage", "editMessageText"):
+            message_id = int(params.get("message_id") or next(self.message_ids))
+            result = {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id") or 0), "type": "private"},
+                "text": params.get("text", ""),
+            }
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+class FakeCluster:
+    """Runs the three fakes on their own event loop in a background thread,
+    so their work doesn't compete with the bot's loop being measured"""
+
+    def __init__(self, notion, gemini, telegram, host="127.0.0.1"):
+        self.services = {"notion": notion, "gemini": gemini, "telegram": telegram}
+        self.host = host
+        self.urls = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._runners = []
+
+    async def _start(self):
+        for name, service in self.services.items():
+            runner = web.AppRunner(service.build_app(), access_log=None)
+            await runner.setup()
+            sock = socket.socket()
+            sock.bind((self.host, 0))
+            await web.SockSite(runner, sock).start()
+            self.urls[name] = f"http://{self.host}:{sock.getsockname()[1]}"
+            self._runners.append(runner)
+
+    async def _stop(self):
+        for runner in self._runners:
+            await runner.cleanup()
+
+    def start(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def stats(self):
+        return {name: dict(service.stats) for name, service in self.services.items()}
@@ -0,0 +1,186 @@
+"""Replay a recorded update log (UPDATE_LOG_FILE) against local fakes.
+
+    python -m benchmarks.replay updates.jsonl                    # original timing
+    python -m benchmarks.replay updates.jsonl --speed 10         # 10x faster
+    python -m benchmarks.replay updates.jsonl --speed 0 --users 50
+
+Every recorded user is mapped to fresh synthetic users, each with their own
+fake Notion database; `--users N` replays the whole log once per synthetic
+copy, concurrently, to load-test with a real traffic shape. Per update it
+reports the queueing delay (queued until handlers start, i.e. waiting for the
+chat's lane or a worker) and the processing time.
+"""
+import argparse
+import asyncio
+import copy
+import itertools
+import json
+import time
+
+from telegram import Update
+
+from benchmarks.run import (
+    add_common_arguments,
+    configure,
+    latency_summary,
+    start_bot,
+    start_cluster,
+    stop_bot,
+)
+from src.bot.update_log import read_update_log
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="JSONL file written with UPDATE_LOG_FILE")
+    parser.add_argument("--speed", type=float, default=1.0, help="time scale (2 = twice as fast, 0 = no waiting)")
+    parser.add_argument("--users", type=int, default=1, help="synthetic copies of every recorded user")
+    parser.add_argument("--stagger", type=float, default=0.0, help="seconds between the starts of each copy")
+    parser.add_argument("--slowest", type=int, default=5, help="slowest updates to list")
+    add_common_arguments(parser)
+    return parser.parse_args(argv)
+
+def _set_id(obj, path, mapping):
+    """Replace a user/chat id found at `path` (a key list) with its synthetic id"""
+    for key in path[:-1]:
+        obj = obj.get(key) if isinstance(obj, dict) else None
+        if obj is None:
+            return
+    if isinstance(obj, dict) and path[-1] in obj:
+        obj[path[-1]] = mapping[obj[path[-1]]]
+
+ID_PATHS = (
+    ("message", "from", "id"),
+    ("message", "chat", "id"),
+    ("callback_query", "from", "id"),
+    ("callback_query", "message", "chat", "id"),
+)
+
+def recorded_user_ids(entries):
+    ids = []
+    for _, raw in entries:
+        for path in ID_PATHS:
+            obj = raw
+            for key in path:
+                obj = obj.get(key) if isinstance(obj, dict) else None
+            if isinstance(obj, int) and obj not in ids:
+                ids.append(obj)
+    return ids
+
+def build_schedule(entries, users, speed, stagger):
+    """Return [(offset seconds, raw update)] for every synthetic copy, in time order, and the users"""
+    recorded = recorded_user_ids(entries)
+    update_ids = itertools.count(1)
+    base = entries[0][0]
+    schedule, tenants = [], []
+    for copy_no in range(users):
+        mapping = {uid: 200_000 + copy_no * len(recorded) + n for n, uid in enumerate(recorded)}
+        tenants.extend((sid, f"replay-db-{sid}") for sid in mapping.values())
+        for arrived, raw in entries:
+            update = copy.deepcopy(raw)
+            for path in ID_PATHS:
+                _set_id(update, path, mapping)
+            update["update_id"] = next(update_ids)
+            offset = (arrived - base) / speed if speed else 0.0
+            schedule.append((offset + copy_no * stagger, update))
+    schedule.sort(key=lambda item: item[0])
+    return schedule, tenants
+
+def describe(raw):
+    if "callback_query" in raw:
+        return "callback", raw["callback_query"].get("data", "")
+    message = raw.get("message") or {}
+    return "message", (message.get("text") or "")[:40]
+
+async def replay(args, entries):
+    from src.utils.metrics import REGISTRY
+
+    schedule, users = build_schedule(entries, args.users, args.speed, args.stagger)
+    started, finished = {}, {}
+    app = await start_bot(users, started=started, finished=finished)
+
+    queued, lateness = {}, []
+    begin = time.perf_counter()
+    for offset, raw in schedule:
+        delay = begin + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        lateness.append(max(0.0, -delay))
+        update = Update.de_json(raw, app.bot)
+        queued[update.update_id] = time.perf_counter()
+        await app.update_queue.put(update)
+    await app.update_queue.join()
+    elapsed = time.perf_counter() - begin
+    await stop_bot(app)
+
+    raws = {raw["update_id"]: raw for _, raw in schedule}
+    waits, processing, total, rows = [], [], [], []
+    for update_id, at in queued.items():
+        if update_id not in started or update_id not in finished:
+            continue
+        wait = started[update_id] - at
+        took = finished[update_id] - started[update_id]
+        waits.append(wait)
+        processing.append(took)
+        total.append(wait + took)
+        rows.append((wait + took, wait, took, update_id, *describe(raws[update_id])))
+    rows.sort(reverse=True)
+
+    return {
+        "log": args.log,
+        "updates": len(schedule),
+        "completed": len(total),
+        "users": len(users),
+        "speed": args.speed,
+        "overrides": args.set,
+        "seconds": round(elapsed, 3),
+        "updates_per_second": round(len(total) / elapsed, 1) if elapsed else None,
+        "max_replay_lag_ms": round(max(lateness, default=0) * 1000, 1),
+        "queueing_delay": latency_summary(waits),
+        "processing": latency_summary(processing),
+        "total": latency_summary(total),
+        "slowest": [
+            {"update_id": u, "kind": kind, "what": what, "total_ms": round(t * 1000, 1),
+             "queued_ms": round(w * 1000, 1), "processing_ms": round(p * 1000, 1)}
+            for t, w, p, u, kind, what in rows[:args.slowest]
+        ],
+        "stages": REGISTRY.summary(),
+    }
+
+def print_report(report):
+    print(f"\nReplayed {report['completed']}/{report['updates']} updates for {report['users']} users "
+          f"at speed {report['speed'] or 'max'} in {report['seconds']}s ({report['updates_per_second']} updates/s, "
+          f"replayer lag up to {report['max_replay_lag_ms']}ms)")
+    print(f"{'':15} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name in ("queueing_delay", "processing", "total"):
+        summary = report[name]
+        print(f"{name:15} {summary['count']:>7} {str(summary['p50_ms']):>9} "
+              f"{str(summary['p95_ms']):>9} {str(summary['p99_ms']):>9}")
+    print("\nSlowest updates:")
+    for row in report["slowest"]:
+        print(f"  #{row['update_id']} {row['kind']} {row['what']!r}: {row['total_ms']}ms "
+              f"(queued {row['queued_ms']}ms, processing {row['processing_ms']}ms)")
+    print("\nPer stage:")
+    for line in report["stages"]:
+        print(f"  {line}")
+
+def main(argv=None):
+    args = parse_args(argv)
+    entries = list(read_update_log(args.log))
+    if not entries:
+        print(f"No updates in {args.log}")
+        return
+
+    cluster = start_cluster(args, create_missing=True)
+    try:
+        configure(args, cluster)
+        report = asyncio.run(replay(args, entries))
+    finally:
+        cluster.stop()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
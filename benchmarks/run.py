@@ -0,0 +1,217 @@
+"""Benchmark the bot's real handlers and services against local fakes.
+
+    python -m benchmarks.run --scenario read-heavy --updates 500 --users 20
+    python -m benchmarks.run --scenario button-storm --rate 50 --notion-latency 0.2
+    python -m benchmarks.run --scenario create-heavy --set UPDATE_WORKERS=1 --json before.json
+
+Updates are fed straight into the Application's update queue (at `--rate`
+per second, or all at once), so the numbers cover the bot itself: queueing,
+parsing, Notion and Telegram calls. Latency is measured from an update being
+queued until its handler returns; a button's background write is not part of
+it, but is waited for before the run ends.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+
+from telegram import Update
+from telegram.ext import TypeHandler
+
+from benchmarks.fakes import FakeCluster, FakeGemini, FakeNotion, FakeTelegram
+from benchmarks.scenarios import SCENARIOS
+from src.config import Config
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="read-heavy")
+    parser.add_argument("--updates", type=int, default=300, help="updates to send")
+    parser.add_argument("--users", type=int, default=10, help="synthetic users, each with their own database")
+    parser.add_argument("--tasks", type=int, default=200, help="tasks per fake database")
+    parser.add_argument("--rate", type=float, default=0, help="updates per second (0 = all at once)")
+    parser.add_argument("--cold", action="store_true", help="don't sync mirrors before measuring")
+    add_common_arguments(parser)
+    return parser.parse_args(argv)
+
+def add_common_arguments(parser):
+    """Fake service behaviour, Config overrides and report output"""
+    for name, latency in (("notion", 0.05), ("gemini", 0.3), ("telegram", 0.02)):
+        parser.add_argument(f"--{name}-latency", type=float, default=latency, help="seconds per request")
+        parser.add_argument(f"--{name}-jitter", type=float, default=latency / 2, help="extra random seconds")
+        parser.add_argument(f"--{name}-rate", type=float, default=0, help="requests per second before 429 (0 = unlimited)")
+        parser.add_argument(f"--{name}-failures", type=float, default=0, help="fraction of requests failing with 500")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="override a Config setting")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+
+def fake_options(args, name):
+    return {
+        "latency": getattr(args, f"{name}_latency"),
+        "jitter": getattr(args, f"{name}_jitter"),
+        "rate_limit": getattr(args, f"{name}_rate"),
+        "failure_rate": getattr(args, f"{name}_failures"),
+        "seed": args.seed,
+    }
+
+def start_cluster(args, tasks=200, create_missing=False):
+    return FakeCluster(
+        FakeNotion(tasks=tasks, create_missing=create_missing, **fake_options(args, "notion")),
+        FakeGemini(**fake_options(args, "gemini")),
+        FakeTelegram(**fake_options(args, "telegram")),
+    ).start()
+
+def configure(args, cluster):
+    """Point the bot at the fakes and apply --set overrides"""
+    Config.UPDATE_LOG_FILE = ""
+    Config.REMINDERS_ENABLED = False
+    Config.TELEGRAM_TOKEN = "123456:bench"
+    Config.TELEGRAM_BASE_URL = f"{cluster.urls['telegram']}/bot"
+    Config.NOTION_BASE_URL = cluster.urls["notion"]
+    Config.GEMINI_KEY = "bench"
+    Config.GEMINI_BASE_URL = cluster.urls["gemini"]
+    for override in args.set:
+        key, _, value = override.partition("=")
+        current = getattr(Config, key)
+        if isinstance(current, bool):
+            value = value.lower() == "true"
+        elif current is not None:
+            value = type(current)(value)
+        setattr(Config, key, value)
+
+def quiet_logs():
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("src."):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+def latency_summary(values):
+    return {
+        "count": len(values),
+        **{f"p{int(q * 100)}_ms": round(percentile(values, q) * 1000, 1) if values else None for q in (0.5, 0.95, 0.99)},
+    }
+
+async def start_bot(users, started=None, finished=None, warm=True):
+    """Build and start the real Application for (user id, database id) tenants.
+
+    `started` and `finished` (dicts) receive perf_counter times keyed by
+    update id when each update's handlers begin and end.
+    """
+    # Imported here so the services pick up the Config set by configure()
+    from src.main import build_application
+    from src.services.ai_service import AIService
+    from src.services.tenants import Tenant, TenantPool, TenantRegistry
+
+    quiet_logs()
+    tenants = TenantPool(TenantRegistry([Tenant(uid, "bench-key", db) for uid, db in users]), max_active=len(users))
+    app = build_application(tenants, AIService(), updater=False)
+
+    def recorder(times):
+        async def record(update, context):
+            times[update.update_id] = time.perf_counter()
+        return record
+
+    if started is not None:
+        app.add_handler(TypeHandler(Update, recorder(started)), group=-1)
+    if finished is not None:
+        app.add_handler(TypeHandler(Update, recorder(finished)), group=1)
+
+    if not warm:
+        app.warm_up = None
+    await app.initialize()
+    await app.post_init(app)
+    await app.start()
+    if warm:
+        for uid, _ in users:
+            workspace = await tenants.get(uid)
+            await workspace.notion_service.sync()
+    return app
+
+async def stop_bot(app):
+    await app.stop()  # also waits for buttons' background writes
+    await app.post_shutdown(app)
+    await app.shutdown()
+
+async def run(args, cluster):
+    from src.utils.metrics import REGISTRY
+
+    rng = random.Random(args.seed)
+    users = [(100_000 + n, f"bench-db-{n}") for n in range(args.users)]
+    queued, finished = {}, {}
+    app = await start_bot(users, finished=finished, warm=not args.cold)
+
+    raw_updates = SCENARIOS[args.scenario](rng, users, args.tasks, args.updates)
+    kinds = {raw["update_id"]: "callback" if "callback_query" in raw else "message" for raw in raw_updates}
+
+    start = time.perf_counter()
+    for index, raw in enumerate(raw_updates):
+        if args.rate:
+            delay = start + index / args.rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        update = Update.de_json(raw, app.bot)
+        queued[update.update_id] = time.perf_counter()
+        await app.update_queue.put(update)
+    await app.update_queue.join()
+    handled = time.perf_counter() - start
+    await stop_bot(app)
+    drained = time.perf_counter() - start
+
+    latencies = {"all": [], "message": [], "callback": []}
+    for update_id, begun in queued.items():
+        if update_id in finished:
+            value = finished[update_id] - begun
+            latencies["all"].append(value)
+            latencies[kinds[update_id]].append(value)
+
+    return {
+        "scenario": args.scenario,
+        "updates": len(raw_updates),
+        "completed": len(latencies["all"]),
+        "users": args.users,
+        "rate": args.rate,
+        "overrides": args.set,
+        "seconds": round(handled, 3),
+        "seconds_with_background_writes": round(drained, 3),
+        "updates_per_second": round(len(latencies["all"]) / handled, 1) if handled else None,
+        "latency": {kind: latency_summary(values) for kind, values in latencies.items() if values},
+        "stages": REGISTRY.summary(),
+        "fakes": cluster.stats(),
+    }
+
+def print_report(report):
+    print(f"\nScenario {report['scenario']}: {report['completed']}/{report['updates']} updates "
+          f"from {report['users']} users in {report['seconds']}s "
+          f"({report['updates_per_second']} updates/s; {report['seconds_with_background_writes']}s incl. background writes)")
+    print(f"{'':10} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for kind, summary in report["latency"].items():
+        print(f"{kind:10} {summary['count']:>7} {summary['p50_ms']:>9} {summary['p95_ms']:>9} {summary['p99_ms']:>9}")
+    print("\nPer stage:")
+    for line in report["stages"]:
+        print(f"  {line}")
+    print("\nFake services:")
+    for name, stats in report["fakes"].items():
+        print(f"  {name:9} {stats}")
+
+def main(argv=None):
+    args = parse_args(argv)
+    cluster = start_cluster(args, tasks=args.tasks)
+    try:
+        configure(args, cluster)
+        report = asyncio.run(run(args, cluster))
+    finally:
+        cluster.stop()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
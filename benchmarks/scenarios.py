@@ -0,0 +1,95 @@
+"""Traffic mixes for the benchmark, as raw Telegram update payloads.
+
+Each scenario is a function (rng, users, tasks, count) -> list of update
+dicts. `users` are (user id, database id) pairs; `tasks` is how many tasks
+each fake database starts with, so button taps can target real pages.
+"""
+import itertools
+import time
+
+from benchmarks.fakes import task_page_id
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+
+def _user(user_id):
+    return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"}
+
+def _chat(user_id):
+    return {"id": user_id, "type": "private"}
+
+def message_update(user_id, text):
+    return {
+        "update_id": next(_update_ids),
+        "message": {
+            "message_id": next(_message_ids),
+            "date": int(time.time()),
+            "chat": _chat(user_id),
+            "from": _user(user_id),
+            "text": text,
+        },
+    }
+
+def callback_update(user_id, data, message_id=None):
+    return {
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": str(next(_update_ids)),
+            "chat_instance": str(user_id),
+            "from": _user(user_id),
+            "data": data,
+            "message": {
+                "message_id": message_id or next(_message_ids),
+                "date": int(time.time()),
+                "chat": _chat(user_id),
+                "text": "task",
+            },
+        },
+    }
+
+def read_heavy(rng, users, tasks, count):
+    """Mostly task lists (served by the local parser), some phrased for Gemini"""
+    updates = []
+    for _ in range(count):
+        user_id, _ = rng.choice(users)
+        text = "list" if rng.random() < 0.8 else "what do I still have to do?"
+        updates.append(message_update(user_id, text))
+    return updates
+
+def create_heavy(rng, users, tasks, count):
+    """New tasks, half through the local parser and half through Gemini"""
+    updates = []
+    for n in range(count):
+        user_id, _ = rng.choice(users)
+        roll = rng.random()
+        if roll < 0.5:
+            text = f"add Benchmark task {n} due tomorrow"
+        elif roll < 0.9:
+            text = f"please remind me to benchmark thing {n}"
+        else:
+            text = f"remind me to buy item {n} and finish Task {rng.randint(1, tasks)}"
+        updates.append(message_update(user_id, text))
+    return updates
+
+def button_storm(rng, users, tasks, count):
+    """Rapid taps on task cards: repeated snoozes and priority flips on a few tasks"""
+    updates = []
+    for _ in range(count):
+        user_id, database_id = rng.choice(users)
+        number = rng.randint(1, min(tasks, 10))
+        page_id = task_page_id(database_id, number)
+        data = rng.choice((
+            f"sz:{page_id}:n",
+            f"sz:{page_id}:n",
+            f"priority_{rng.choice(('Low', 'Medium', 'High'))}_{page_id}",
+            f"done_{page_id}",
+        ))
+        # One card per task, so taps on it share a message like they would in a chat
+        updates.append(callback_update(user_id, data, message_id=number))
+    return updates
+
+SCENARIOS = {
+    "read-heavy": read_heavy,
+    "create-heavy": create_heavy,
+    "button-storm": button_storm,
+}
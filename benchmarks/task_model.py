@@ -0,0 +1,148 @@
+"""Microbenchmark of the Task model: parse cost, render cost and memory per task.
+
+    python -m benchmarks.task_model
+    python -m benchmarks.task_model --tasks 5000 --json tasks.json
+
+Pages are shaped like real Notion API responses (user and parent objects,
+rich text annotations, property ids), decoded from JSON so no strings are
+shared between them. Memory is what a list of N pages or N Tasks keeps
+alive, measured with tracemalloc. Rendering from a page includes parsing
+it, which is what every render cost before tasks were parsed once.
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+import uuid
+
+from src.services.task import Task
+from src.utils.formatters import format_task_details, format_task_line
+
+STATUSES = ("Pending", "In Progress", "Done")
+PRIORITIES = ("Low", "Medium", "High")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=2000, help="pages to build")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs (the best one is kept)")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    return parser.parse_args(argv)
+
+def _rich_text(text):
+    return {
+        "type": "text",
+        "text": {"content": text, "link": None},
+        "annotations": {
+            "bold": False, "italic": False, "strikethrough": False,
+            "underline": False, "code": False, "color": "default",
+        },
+        "plain_text": text,
+        "href": None,
+    }
+
+def notion_page(number, database_id="bench-db"):
+    """A task page as the Notion API returns it from a query"""
+    page_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{database_id}/{number}"))
+    user = {"object": "user", "id": str(uuid.uuid5(uuid.NAMESPACE_URL, "bench-user"))}
+    return {
+        "object": "page",
+        "id": page_id,
+        "created_time": "2026-01-05T09:12:00.000Z",
+        "last_edited_time": f"2026-02-{1 + number % 28:02d}T10:{number % 60:02d}:00.000Z",
+        "created_by": user,
+        "last_edited_by": user,
+        "cover": None,
+        "icon": None,
+        "parent": {"type": "database_id", "database_id": database_id},
+        "archived": False,
+        "in_trash": False,
+        "properties": {
+            "Status": {"id": "%3AKx%5D", "type": "select", "select": {
+                "id": "1f0c", "name": STATUSES[number % 3], "color": "blue"}},
+            "Priority": {"id": "B%3C%7Cq", "type": "select", "select": {
+                "id": "9a2e", "name": PRIORITIES[number % 3], "color": "red"}},
+            "Due Date": {"id": "Vy%5Cn", "type": "date", "date": {
+                "start": f"2026-03-{1 + number % 28:02d}", "end": None, "time_zone": None}
+                if number % 4 else None},
+            "Description": {"id": "d%40Tg", "type": "rich_text", "rich_text": [
+                _rich_text(f"Details for task number {number}, with a sentence or two of context.")]},
+            "ID": {"id": "nXy%3F", "type": "unique_id", "unique_id": {"prefix": "T", "number": number}},
+            "Name": {"id": "title", "type": "title", "title": [_rich_text(f"Follow up on report #{number}")]},
+        },
+        "url": f"https://www.notion.so/Follow-up-on-report-{number}-{page_id.replace('-', '')}",
+        "public_url": None,
+    }
+
+def fresh_pages(count):
+    """Independent page objects, as decoded from an API response"""
+    return json.loads(json.dumps([notion_page(number) for number in range(1, count + 1)]))
+
+def retained(build):
+    """(result of build(), bytes it keeps allocated)"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+def parse_tasks(count):
+    pages = fresh_pages(count)
+    return [Task.from_page(page) for page in pages]  # the pages are freed on return
+
+def best_time(func, items, repeat):
+    """Best per-item seconds of calling func(item) over every item"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(items)
+
+def render(task):
+    format_task_details(task)
+    format_task_line(task)
+
+def render_page(page):
+    render(Task.from_page(page))
+
+def run(args):
+    pages, page_bytes = retained(lambda: fresh_pages(args.tasks))
+    tasks, task_bytes = retained(lambda: parse_tasks(args.tasks))
+
+    timings = {
+        "parse": best_time(Task.from_page, pages, args.repeat),
+        "render_from_task": best_time(render, tasks, args.repeat),
+        "render_from_page": best_time(render_page, pages, args.repeat),
+    }
+    return {
+        "tasks": args.tasks,
+        "bytes_per_page": round(page_bytes / args.tasks),
+        "bytes_per_task": round(task_bytes / args.tasks),
+        "memory_ratio": round(page_bytes / task_bytes, 1) if task_bytes else None,
+        **{f"{name}_us": round(seconds * 1e6, 2) for name, seconds in timings.items()},
+    }
+
+def print_report(report):
+    print(f"\n{report['tasks']} tasks")
+    print(f"  memory:            {report['bytes_per_page']:>7} B/page  {report['bytes_per_task']:>7} B/task "
+          f"({report['memory_ratio']}x smaller)")
+    print(f"  parse:             {report['parse_us']:>7} µs/task")
+    print(f"  render from Task:  {report['render_from_task_us']:>7} µs/task")
+    print(f"  render from page:  {report['render_from_page_us']:>7} µs/task (parse + render)")
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import asyncio
+import time
+
+from telegram.ext import Application
+
+from src.config import Config
+from src.utils.logger import set_trace, setup_logger
+
+logger = setup_logger(__name__)
+
+def update_lane(update):
+    """Key of the ordering lane an update belongs to, or None if it can run freely.
+
+    Messages are ordered per chat. Button taps are ordered per message they were
+    pressed on, so taps on different task cards don't wait for each other or for
+    a slow text command; a card only exists once the command that sent it has
+    replied, so a tap can never overtake the command that created its task.
+    """
+    query = getattr(update, "callback_query", None)
+    if query is not None:
+        if query.message is not None:
+            return ("message", query.message.chat_id, query.message.message_id)
+        return ("inline", query.inline_message_id or query.id)
+    chat = getattr(update, "effective_chat", None)
+    if chat is not None:
+        return ("chat", chat.id)
+    return None
+
+class OrderedApplication(Application):
+    """Application that handles updates concurrently while keeping each lane in order.
+
+    At most `update_workers` handlers run at once, and at most
+    `per_user` of them for any one user, so a heavy tenant can't take every
+    worker. Updates waiting for their lane or user don't hold a worker, so one
+    busy chat never stalls the others.
+    """
+
+    def __init__(self, *, update_workers=None, per_user=None, **kwargs):
+        # Admit updates concurrently; the worker semaphore below sets the real limit
+        kwargs["concurrent_updates"] = True
+        super().__init__(**kwargs)
+        self.update_workers = update_workers or Config.UPDATE_WORKERS
+        self._workers = asyncio.Semaphore(self.update_workers)
+        self.per_user = per_user or Config.TENANT_MAX_CONCURRENCY
+        self._lanes = {}  # lane -> [lock, number of updates using it]
+        self._users = {}  # user id -> [semaphore, number of updates using it]
+        self.update_recorder = None  # UpdateRecorder capturing arrivals, if enabled
+        self.state_store = None  # StateStore used to skip updates handled before, if enabled
+        self.warm_up = None  # async fn(app) getting services ready, run during initialize()
+        self.stop_services = None  # async fn(app) winding services down, run at the end of stop()
+        self.startup_times = {}  # seconds per startup step
+        self.stats = {"processed": 0, "waited_for_lane": 0, "duplicates": 0}
+
+    async def initialize(self):
+        """Log in to Telegram (getMe) while `warm_up` gets the services ready"""
+        async def login():
+            start = time.perf_counter()
+            await super(OrderedApplication, self).initialize()
+            self.startup_times["telegram"] = time.perf_counter() - start
+
+        if self.warm_up is None:
+            await login()
+        else:
+            await asyncio.gather(login(), self.warm_up(self))
+
+    async def stop(self):
+        """Finish pending updates and tasks, then run `stop_services`.
+
+        Both polling and webhook mode call this before shutdown() closes the
+        bot's connection, so whatever the services still send gets delivered.
+        """
+        await super().stop()
+        if self.stop_services is not None:
+            await self.stop_services(self)
+
+    async def process_update(self, update):
+        user = getattr(update, "effective_user", None)
+        set_trace(getattr(update, "update_id", None), user.id if user else None)
+        if self.update_recorder is not None:
+            self.update_recorder.record(update)
+
+        # Telegram redelivers updates it didn't see confirmed, e.g. after a restart
+        store, update_id = self.state_store, getattr(update, "update_id", None)
+        if store is None or update_id is None:
+            await self._process_in_lane(update)
+            return
+        if not store.claim_update(update_id):
+            self.stats["duplicates"] += 1
+            return
+        try:
+            await self._process_in_lane(update)
+        except BaseException:
+            store.release_update(update_id)
+            raise
+        store.finish_update(update_id)
+
+    async def _process_in_lane(self, update):
+        lane = update_lane(update)
+        if lane is None:
+            await self._process_for_user(update)
+            return
+
+        slot = self._lanes.setdefault(lane, [asyncio.Lock(), 0])
+        slot[1] += 1
+        try:
+            if slot[0].locked():
+                self.stats["waited_for_lane"] += 1
+            async with slot[0]:
+                await self._process_for_user(update)
+        finally:
+            slot[1] -= 1
+            if slot[1] == 0:
+                self._lanes.pop(lane, None)
+
+    async def _process_for_user(self, update):
+        user = getattr(update, "effective_user", None)
+        if user is None:
+            await self._process(update)
+            return
+
+        slot = self._users.setdefault(user.id, [asyncio.Semaphore(self.per_user), 0])
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                await self._process(update)
+        finally:
+            slot[1] -= 1
+            if slot[1] == 0:
+                self._users.pop(user.id, None)
+
+    async def _process(self, update):
+        async with self._workers:
+            await super().process_update(update)
+        self.stats["processed"] += 1
@@ -0,0 +1,150 @@
+import asyncio
+import time
+
+from src.config import Config
+from src.utils.dates import local_today
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Seconds between progress edits of the status message
+PROGRESS_INTERVAL = 1.0
+# Failures listed by name in the summary
+MAX_LISTED_FAILURES = 10
+
+UPDATE_FIELDS = ("status", "priority", "due_date")
+
+def plan_bulk(data):
+    """(action, updates, selector) from a bulk command's data, or None if it is incomplete"""
+    action = data.get("action")
+    updates = {key: data[key] for key in UPDATE_FIELDS if data.get(key)}
+    if action not in ("update", "delete") or (action == "update" and not updates):
+        return None
+    return action, updates, data.get("filter") or {}
+
+async def select_tasks(notion_service, selector):
+    """Tasks a selector picks, with one filtered query, capped at BULK_MAX_TASKS.
+
+    Returns (tasks, whether more matched than the cap). Pages past the cap
+    are never fetched. "Today" is the date in REMINDER_TIMEZONE, the same
+    day reminders and the digest use.
+    """
+    today = local_today(Config.REMINDER_TIMEZONE).isoformat()
+    tasks = await notion_service.query_tasks(
+        selection_filter(selector, today),
+        sorts=[{"property": "Due Date", "direction": "ascending"}],
+        limit=Config.BULK_MAX_TASKS + 1,  # one extra tells whether any were left out
+    )
+    return tasks[:Config.BULK_MAX_TASKS], len(tasks) > Config.BULK_MAX_TASKS
+
+def selection_filter(selector, today):
+    """Notion filter for a bulk selector.
+
+    `selector` may hold "status", "priority" and "due" ("overdue", "today",
+    "none" or a YYYY-MM-DD date). Without a status, Done tasks are left out.
+    """
+    selector = selector or {}
+    parts = []
+    if selector.get("status"):
+        parts.append({"property": "Status", "select": {"equals": selector["status"]}})
+    else:
+        parts.append({"property": "Status", "select": {"does_not_equal": "Done"}})
+    if selector.get("priority"):
+        parts.append({"property": "Priority", "select": {"equals": selector["priority"]}})
+
+    due = selector.get("due")
+    if due == "overdue":
+        parts.append({"property": "Due Date", "date": {"before": today}})
+    elif due == "today":
+        parts.append({"property": "Due Date", "date": {"equals": today}})
+    elif due == "none":
+        parts.append({"property": "Due Date", "date": {"is_empty": True}})
+    elif due:
+        parts.append({"property": "Due Date", "date": {"equals": due}})
+    return parts[0] if len(parts) == 1 else {"and": parts}
+
+def describe_selection(selector):
+    """Human wording of a selector, e.g. "overdue High priority tasks" """
+    selector = selector or {}
+    words = []
+    due = selector.get("due")
+    if due == "overdue":
+        words.append("overdue")
+    if selector.get("status"):
+        words.append(selector["status"])
+    if selector.get("priority"):
+        words.append(f"{selector['priority']} priority")
+    words.append("tasks")
+    if due == "today":
+        words.append("due today")
+    elif due == "none":
+        words.append("without a due date")
+    elif due and due != "overdue":
+        words.append(f"due {due}")
+    return " ".join(words)
+
+def needs_confirmation(action, updates, selector):
+    """Deletes, and status changes to every open task, wait for a tap on Confirm"""
+    return action == "delete" or (not selector and "status" in updates)
+
+def describe_changes(action, updates):
+    if action == "delete":
+        return "deleted"
+    return ", ".join(f"{key.replace('_', ' ')} → {value}" for key, value in updates.items())
+
+async def run_bulk(workspace, action, tasks, updates=None, progress=None):
+    """Apply one update (or delete) to every task, at most BULK_CONCURRENCY at a time.
+
+    Deletes go through the workspace's write buffer, after any writes queued
+    for the same task. Every call still goes through the Notion rate limiter, so a
+    large batch spends the workspace's budget evenly instead of bursting.
+    `progress(done, total)` is awaited after each task, throttled to one
+    call per PROGRESS_INTERVAL. Returns the list of (task, error) failures.
+    """
+    slots = asyncio.Semaphore(Config.BULK_CONCURRENCY)
+    failures = []
+    done = 0
+    last_report = time.monotonic()
+
+    async def apply(task):
+        nonlocal done, last_report
+        async with slots:
+            try:
+                if action == "delete":
+                    await workspace.write_buffer.delete(task.id)
+                else:
+                    await workspace.notion_service.update_task(task.id, updates)
+            except Exception as e:
+                failures.append((task, e))
+        done += 1
+        now = time.monotonic()
+        if progress is not None and done < len(tasks) and now - last_report >= PROGRESS_INTERVAL:
+            last_report = now
+            try:
+                await progress(done, len(tasks))
+            except Exception as e:
+                logger.warning("Could not show bulk progress: %s", e)
+
+    await asyncio.gather(*(apply(task) for task in tasks))
+    if failures:
+        logger.warning("Bulk %s: %d of %d tasks failed", action, len(failures), len(tasks))
+    return failures
+
+def bulk_summary(action, updates, selector, total, failures, more=False, label=str):
+    """Final message of a bulk run, listing failed tasks by `label(task)`"""
+    verb = "Deleted" if action == "delete" else "Updated"
+    lines = [
+        f"{'✅' if not failures else '⚠️'} {verb} {total - len(failures)} of {total} "
+        f"{describe_selection(selector)} ({describe_changes(action, updates)})."
+    ]
+    if more:
+        lines.append(f"More than {Config.BULK_MAX_TASKS} matched; the rest were left alone (limit per command).")
+    if failures:
+        lines.append("\nFailed:")
+        lines.extend(
+            f"• {label(task)}: {str(error).splitlines()[0] if str(error) else type(error).__name__}"
+            for task, error in failures[:MAX_LISTED_FAILURES]
+        )
+        if len(failures) > MAX_LISTED_FAILURES:
+            lines.append(f"…and {len(failures) - MAX_LISTED_FAILURES} more")
+    return "\n".join(lines)
@@ -1,13 +1,23 @@
 from telegram import Update
 from telegram.ext import ContextTypes
-from datetime import datetime, timedelta
 import asyncio
+import secrets
+import time
 
 from src.config import Config
 from src.utils.logger import setup_logger
 from src.utils.formatters import format_task_details
+from src.utils.metrics import UPDATE_SECONDS, intent_label
+from src.services.task_index import is_ambiguous, normalize
+from src.services.write_buffer import UNKNOWN
+from src.utils.dates import decode_due, parse_snooze, snooze_description
+from src.bot.sender import edit_message, edit_message_text, reply_text
+from src.bot.bulk import bulk_summary, describe_changes, describe_selection, needs_confirmation, plan_bulk, run_bulk, select_tasks
+from src.bot.task_list import current_task, get_task_list, render_task_list, store_task_list
 from src.bot.keyboards import (
     create_task_keyboard,
+    create_disambiguation_keyboard,
+    create_bulk_confirm_keyboard,
     create_edit_keyboard,
     create_status_keyboard,
     create_priority_keyboard
@@ -15,60 +25,199 @@ from src.bot.keyboards import (
 
 logger = setup_logger(__name__)
 
-async def send_tasks_with_buttons(update_or_query, tasks):
-    """Send tasks with inline action buttons"""
-    # Determine if this is from a message or callback query
-    if isinstance(update_or_query, Update):
-        send_func = update_or_query.message.reply_text
-    else:
-        # It's a callback query
-        send_func = update_or_query.message.reply_text
-    
-    if not tasks:
+MAX_PENDING_ACTIONS = 20
+
+def pending_task_sorts():
+    """Build the Notion sorts for the task list from config"""
+    if not Config.TASK_LIST_SORT:
+        return None
+    return [{"property": Config.TASK_LIST_SORT, "direction": "ascending"}]
+
+async def send_tasks_with_buttons(update_or_query, context, tasks, mirror=None):
+    """Send tasks as one paginated list message with inline buttons.
+
+    `tasks` is either a list of Tasks or an async iterator of Task batches.
+    With an iterator, if enough tasks for the first page have arrived while
+    another batch is still being fetched, the first page is shown right away
+    and edited with the final count once the stream ends. A stream that is
+    already complete (the mirror, a single page of results) is sent once.
+    `mirror` supplies fresher copies of the tasks when rendering.
+    """
+    # Both an Update and a callback query carry the message to reply to
+    message_to_reply = update_or_query.message
+
+    async def send_func(text, **kwargs):
+        return await reply_text(context, message_to_reply, text, **kwargs)
+
+    if isinstance(tasks, list):
+        if not tasks:
+            await send_func("No pending tasks found!")
+            return
+
+        token = store_task_list(context.chat_data, tasks)
+        text, keyboard = render_task_list(tasks, token, 0, mirror=mirror)
+        await send_func(text, reply_markup=keyboard, parse_mode="Markdown")
+        return
+
+    collected = []
+    token = None
+    message = None
+    batches = aiter(tasks)
+    upcoming = asyncio.ensure_future(anext(batches, None))
+    try:
+        while (batch := await upcoming) is not None:
+            collected.extend(batch)
+            upcoming = asyncio.ensure_future(anext(batches, None))
+            if message is None and len(collected) >= Config.TASK_LIST_PAGE_SIZE:
+                # One loop step lets a stream with nothing left to fetch run to its end
+                await asyncio.sleep(0)
+                if not upcoming.done():
+                    # The stored list is `collected` itself, so paging sees later batches too
+                    token = store_task_list(context.chat_data, collected)
+                    text, keyboard = render_task_list(collected, token, 0, complete=False, mirror=mirror)
+                    message = await send_func(text, reply_markup=keyboard, parse_mode="Markdown")
+    finally:
+        # On an error or cancellation, stop the prefetch and close the stream with it
+        if not upcoming.done():
+            upcoming.cancel()
+        await asyncio.gather(upcoming, return_exceptions=True)
+        if hasattr(batches, "aclose"):
+            await batches.aclose()
+
+    if not collected:
         await send_func("No pending tasks found!")
         return
-    
-    await send_func(f"*Pending Tasks:* ({len(tasks)} total)\n", parse_mode="Markdown")
-    
-    for task in tasks:
-        task_text = format_task_details(task)
-        keyboard = create_task_keyboard(task["id"])
-        await send_func(task_text, reply_markup=keyboard, parse_mode="Markdown")
+
+    if message is None:
+        token = store_task_list(context.chat_data, collected)
+        text, keyboard = render_task_list(collected, token, 0, mirror=mirror)
+        await send_func(text, reply_markup=keyboard, parse_mode="Markdown")
+    else:
+        text, keyboard = render_task_list(collected, token, 0, mirror=mirror)
+        await edit_message(context, message, text, reply_markup=keyboard, parse_mode="Markdown")
+
+def remember_pending_action(context, action):
+    """Park an action until the user picks which task it applies to"""
+    pending = context.user_data.setdefault("pending_actions", {})
+    while len(pending) >= MAX_PENDING_ACTIONS:
+        pending.pop(next(iter(pending)))
+    token = secrets.token_hex(4)
+    pending[token] = action
+    return token
+
+async def resolve_task(update, context, notion_service, target_name, target_id, action):
+    """Find the task a message refers to.
+
+    Returns the Task, or None after replying (not found, or a disambiguation
+    keyboard was shown because several titles match about equally well).
+    """
+    if target_id:
+        task = await notion_service.find_task_by_custom_id(target_id)
+        if not task:
+            await reply_text(context, update.message, f"Could not find task with ID {target_id}.")
+        return task
+
+    matches = await notion_service.match_tasks(target_name)
+    matches = [(score, task) for score, task in matches if score >= Config.TASK_MATCH_MIN_SCORE]
+    if not matches:
+        await reply_text(context, update.message, f"Could not find task matching '{target_name}'.")
+        return None
+
+    if is_ambiguous(matches, Config.TASK_MATCH_MARGIN):
+        best = matches[0][0]
+        options = [
+            (task_label(task), task.id)
+            for score, task in matches
+            if best - score < Config.TASK_MATCH_MARGIN
+        ]
+        token = remember_pending_action(context, action)
+        await reply_text(
+            context, update.message,
+            f"Several tasks match '{target_name}'. Which one did you mean?",
+            reply_markup=create_disambiguation_keyboard(token, options)
+        )
+        return None
+
+    return matches[0][1]
+
+def task_label(task):
+    """Short button label for a task: title plus unique ID"""
+    title = task.title or "Untitled"
+    if task.number is not None:
+        return f"#{task.number} {title}"[:60]
+    return title[:60]
+
+async def apply_task_action(workspace, page_id, action):
+    """Run a resolved update/delete and return the confirmation text"""
+    if action["intent"] == "delete":
+        await workspace.write_buffer.delete(page_id)
+        return "Task deleted (archived)."
+
+    result = await workspace.notion_service.update_task(page_id, action["updates"])
+    return f"Task Updated!\n\n{format_task_details(result)}"
+
+async def get_workspace(context, user):
+    """The user's tenant workspace, or None if they may not use the bot"""
+    return await context.bot_data["tenants"].get(user.id)
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user_id = update.effective_user.id
+    start = time.perf_counter()
+    intent, outcome = "none", "error"
+    try:
+        intent, outcome = await process_message(update, context)
+    finally:
+        UPDATE_SECONDS.observe(time.perf_counter() - start, "message", intent, outcome)
 
-    if user_id != Config.AUTHORIZED_USER_ID:
-        await update.message.reply_text("You are not authorized to use this bot.")
-        return
+async def process_message(update, context):
+    """Parse and run a text message; returns (intent, outcome) labels for metrics"""
+    workspace = await get_workspace(context, update.effective_user)
+
+    if workspace is None:
+        await reply_text(context, update.message, "You are not authorized to use this bot.")
+        return "none", "unauthorized"
     
     user_text = update.message.text
     ai_service = context.bot_data["ai_service"]
-    notion_service = context.bot_data["notion_service"]
 
-    # Run AI parsing in a thread to avoid blocking
     try:
-        parsed_result = await asyncio.to_thread(ai_service.parse_intent, user_text)
+        commands = await ai_service.parse_commands_async(user_text, update.effective_user.id)
     except Exception as e:
-        await update.message.reply_text(f"Failed to process with AI: {e}")
-        return
+        await reply_text(context, update.message, f"Failed to process with AI: {e}")
+        return "none", "ai_error"
 
-    if not parsed_result:
-        await update.message.reply_text("Failed to parse intent from AI.")
-        return
+    if not commands:
+        await reply_text(context, update.message, "Failed to parse intent from AI.")
+        return "none", "unparsed"
+
+    if len(commands) == 1:
+        outcome = await handle_command(update, context, commands[0], workspace)
+    else:
+        outcome = await handle_multiple_commands(update, context, commands[:Config.MAX_COMMANDS_PER_MESSAGE], workspace)
+    return intent_label(commands), outcome
 
+async def handle_command(update: Update, context: ContextTypes.DEFAULT_TYPE, parsed_result, workspace):
+    """Execute a single parsed command against the user's workspace, replying interactively.
+
+    Returns the outcome ("ok", "invalid", "unresolved" or "error") for metrics.
+    """
+    notion_service = workspace.notion_service
     intent = parsed_result.get("intent")
     data = parsed_result.get("data", {})
 
-    logger.info(f"User intent: {intent}, Data: {data}")
+    logger.info("User intent: %s (via %s)", intent, parsed_result.get("source"), extra={"sample": Config.LOG_SAMPLE_RATE})
+    logger.debug("Command data: %s", data)
 
     if intent == "read":
         try:
-            tasks = await notion_service.get_pending_tasks()
-            await send_tasks_with_buttons(update, tasks)
+            tasks = notion_service.iter_pending_tasks(
+                sorts=pending_task_sorts(),
+                limit=Config.TASK_LIST_LIMIT or None,
+            )
+            await send_tasks_with_buttons(update, context, tasks, notion_service.mirror)
         except Exception as e:
-            await update.message.reply_text(f"Error fetching tasks: {e}")
-        return
+            await reply_text(context, update.message, f"Error fetching tasks: {e}")
+            return "error"
+        return "ok"
 
     elif intent == "create":
         try:
@@ -79,134 +228,379 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             description = data.get("description") or ""
             due_date = data.get("due_date")
 
-            new_page = await notion_service.create_task(
+            new_task = await notion_service.create_task(
                 title, status, priority, description, due_date
             )
             
             # Show created task with action buttons
-            confirm_msg = f"Task Created!\n\n{format_task_details(new_page)}"
-            keyboard = create_task_keyboard(new_page["id"])
-            await update.message.reply_text(confirm_msg, reply_markup=keyboard, parse_mode="Markdown")
+            confirm_msg = f"Task Created!\n\n{format_task_details(new_task)}"
+            keyboard = create_task_keyboard(new_task.id, task=new_task)
+            await reply_text(context, update.message, confirm_msg, reply_markup=keyboard, parse_mode="Markdown")
         
         except Exception as e:
-            await update.message.reply_text(f"Failed to create task in Notion: {e}")
-            logger.error(f"Create error details: {e}")
-        return
+            await reply_text(context, update.message, f"Failed to create task in Notion: {e}")
+            logger.error("Create error details: %s", e)
+            return "error"
+        return "ok"
 
     elif intent == "update":
         target_name = data.get("target_task_name")
         target_id = data.get("target_task_id")
         
         if not target_name and not target_id:
-            await update.message.reply_text("I need a task name or ID to update.")
-            return
+            await reply_text(context, update.message, "I need a task name or ID to update.")
+            return "invalid"
+
+        # Prepare updates
+        updates = {}
+        if data.get("status"): updates["status"] = data["status"]
+        if data.get("priority"): updates["priority"] = data["priority"]
+        if data.get("due_date"): updates["due_date"] = data["due_date"]
+        if data.get("new_title"): updates["new_title"] = data["new_title"]
+
+        if not updates:
+            await reply_text(context, update.message, "No updates detected.")
+            return "invalid"
 
+        action = {"intent": "update", "updates": updates}
         try:
-            task_page = None
-            if target_id:
-                task_page = await notion_service.find_task_by_custom_id(target_id)
-                if not task_page:
-                    await update.message.reply_text(f"Could not find task with ID {target_id}.")
-                    return
-            elif target_name:
-                task_page = await notion_service.find_task_by_name(target_name)
-                if not task_page:
-                    await update.message.reply_text(f"Could not find task matching '{target_name}'.")
-                    return
-            
-            # Prepare updates
-            updates = {}
-            if data.get("status"): updates["status"] = data["status"]
-            if data.get("priority"): updates["priority"] = data["priority"]
-            if data.get("due_date"): updates["due_date"] = data["due_date"]
-            if data.get("new_title"): updates["new_title"] = data["new_title"]
-
-            if not updates:
-                await update.message.reply_text("No updates detected.")
-                return
+            task = await resolve_task(update, context, notion_service, target_name, target_id, action)
+            if not task:
+                return "unresolved"
 
-            result = await notion_service.update_task(task_page["id"], updates)
-            await update.message.reply_text(f"Task Updated!\n\n{format_task_details(result)}", parse_mode="Markdown")
+            text = await apply_task_action(workspace, task.id, action)
+            await reply_text(context, update.message, text, parse_mode="Markdown")
         except Exception as e:
-            await update.message.reply_text(f"Failed to update task: {e}")
-        return
+            await reply_text(context, update.message, f"Failed to update task: {e}")
+            return "error"
+        return "ok"
 
     elif intent == "delete":
         target_name = data.get("target_task_name")
         target_id = data.get("target_task_id")
         
         if not target_name and not target_id:
-            await update.message.reply_text("I need a task name or ID to delete.")
-            return
+            await reply_text(context, update.message, "I need a task name or ID to delete.")
+            return "invalid"
 
+        action = {"intent": "delete"}
         try:
-            task_page = None
-            if target_id:
-                task_page = await notion_service.find_task_by_custom_id(target_id)
-                if not task_page:
-                    await update.message.reply_text(f"Could not find task with ID {target_id}.")
-                    return
-            elif target_name:
-                task_page = await notion_service.find_task_by_name(target_name)
-                if not task_page:
-                    await update.message.reply_text(f"Could not find task matching '{target_name}'.")
-                    return
+            task = await resolve_task(update, context, notion_service, target_name, target_id, action)
+            if not task:
+                return "unresolved"
 
-            await notion_service.delete_task(task_page["id"])
-            await update.message.reply_text(f"Task deleted (archived).")
+            text = await apply_task_action(workspace, task.id, action)
+            await reply_text(context, update.message, text)
         except Exception as e:
-            await update.message.reply_text(f"Failed to delete task: {e}")
-        return
+            await reply_text(context, update.message, f"Failed to delete task: {e}")
+            return "error"
+        return "ok"
+
+    elif intent == "bulk":
+        return await handle_bulk(update, context, data, workspace)
 
     else:
-        await update.message.reply_text("❓ Unknown intent.")
+        await reply_text(context, update.message, "❓ Unknown intent.")
+        return "invalid"
+
+async def handle_bulk(update, context, data, workspace):
+    """Apply one change to every task a selector picks, editing a single status message as it goes"""
+    plan = plan_bulk(data)
+    if plan is None:
+        await reply_text(context, update.message, "I couldn't tell what to change for those tasks.")
+        return "invalid"
+    action, updates, selector = plan
+    notion_service = workspace.notion_service
+
+    try:
+        tasks, more = await select_tasks(notion_service, selector)
+    except Exception as e:
+        await reply_text(context, update.message, f"Failed to find tasks: {e}")
+        return "error"
+    if not tasks:
+        await reply_text(context, update.message, f"No {describe_selection(selector)} found.")
+        return "ok"
+
+    if needs_confirmation(action, updates, selector):
+        # The tasks are selected again on Confirm, so changes made meanwhile count
+        token = remember_pending_action(context, {"intent": "bulk", "plan": plan})
+        verb = "Delete" if action == "delete" else "Update"
+        changes = "" if action == "delete" else f" ({describe_changes(action, updates)})"
+        note = f"\nMore than {len(tasks)} match; the rest will be left alone (limit per command)." if more else ""
+        await reply_text(
+            context, update.message,
+            f"{verb} {len(tasks)} {describe_selection(selector)}{changes}?{note}",
+            reply_markup=create_bulk_confirm_keyboard(token, f"{verb} {len(tasks)}")
+        )
+        return "ok"
+
+    verb = "Deleting" if action == "delete" else "Updating"
+    message = await reply_text(context, update.message, f"⏳ {verb} {len(tasks)} {describe_selection(selector)}…")
+    failures = await run_bulk_with_progress(context, message, workspace, plan, tasks, more)
+    return "partial" if failures else "ok"
+
+async def run_bulk_with_progress(context, message, workspace, plan, tasks, more):
+    """Run a bulk change, editing `message` with progress and then the summary"""
+    action, updates, selector = plan
+    verb = "Deleting" if action == "delete" else "Updating"
+
+    async def progress(done, total):
+        await edit_message(context, message, f"⏳ {verb} {describe_selection(selector)}… {done}/{total}")
+
+    failures = await run_bulk(workspace, action, tasks, updates, progress)
+    await edit_message(context, message, bulk_summary(action, updates, selector, len(tasks), failures, more, task_label))
+    return failures
+
+def command_group_key(command, index):
+    """Commands that touch the same task must run in order; others are independent"""
+    data = command.get("data") or {}
+    if command.get("intent") == "bulk":
+        return "bulk"  # may touch any task; bulk changes at least run in the order given
+    if command.get("intent") in ("update", "delete"):
+        if data.get("target_task_id"):
+            return f"id:{data['target_task_id']}"
+        if data.get("target_task_name"):
+            return f"name:{normalize(data['target_task_name'])}"
+    return f"command:{index}"
+
+async def find_target(notion_service, target_name, target_id):
+    """Non-interactive task lookup; returns (Task, error message)"""
+    if target_id:
+        task = await notion_service.find_task_by_custom_id(target_id)
+        return task, None if task else f"could not find task with ID {target_id}"
+
+    if not target_name:
+        return None, "no task name or ID given"
+
+    matches = await notion_service.match_tasks(target_name)
+    matches = [(score, task) for score, task in matches if score >= Config.TASK_MATCH_MIN_SCORE]
+    if not matches:
+        return None, f"could not find task matching '{target_name}'"
+    if is_ambiguous(matches, Config.TASK_MATCH_MARGIN):
+        return None, f"several tasks match '{target_name}', please send it on its own"
+    return matches[0][1], None
+
+async def execute_command(workspace, command):
+    """Run one command of a multi-command message and describe the outcome"""
+    notion_service = workspace.notion_service
+    intent = command.get("intent")
+    data = command.get("data") or {}
+
+    if intent == "create":
+        new_task = await notion_service.create_task(
+            data.get("title") or "Untitled Task",
+            data.get("status") or "Pending",
+            data.get("priority") or "Medium",
+            data.get("description") or "",
+            data.get("due_date"),
+        )
+        return f"✅ Created {task_label(new_task)}"
+
+    if intent in ("update", "delete"):
+        task, error = await find_target(notion_service, data.get("target_task_name"), data.get("target_task_id"))
+        if not task:
+            return f"⚠️ {intent.capitalize()} skipped: {error}"
+
+        if intent == "delete":
+            await workspace.write_buffer.delete(task.id)
+            return f"🗑 Deleted {task_label(task)}"
+
+        updates = {key: data[key] for key in ("status", "priority", "due_date", "new_title") if data.get(key)}
+        if not updates:
+            return f"⚠️ Update skipped: no changes for {task_label(task)}"
+        result = await notion_service.update_task(task.id, updates)
+        changes = ", ".join(f"{key.replace('_', ' ')} → {value}" for key, value in updates.items())
+        return f"✏️ Updated {task_label(result)}: {changes}"
+
+    if intent == "bulk":
+        plan = plan_bulk(data)
+        if plan is None:
+            return "⚠️ Bulk change skipped: no action or changes given"
+        action, updates, selector = plan
+        if needs_confirmation(action, updates, selector):
+            return f"⚠️ Bulk change skipped: send it on its own to confirm it ({describe_changes(action, updates)} for {describe_selection(selector)})"
+        tasks, more = await select_tasks(notion_service, selector)
+        failures = await run_bulk(workspace, action, tasks, updates)
+        return bulk_summary(action, updates, selector, len(tasks), failures, more, task_label)
+
+    return f"❓ Unknown intent '{intent}'"
+
+async def handle_multiple_commands(update: Update, context: ContextTypes.DEFAULT_TYPE, commands, workspace):
+    """Run several commands from one message and reply with one summary.
+
+    Commands aimed at the same task run in the order given; everything else
+    runs concurrently, at most MULTI_COMMAND_CONCURRENCY at a time. A "read"
+    is shown after the writes so the list reflects them. Returns "ok", or
+    "partial" if any command failed.
+    """
+    notion_service = workspace.notion_service
+    slots = asyncio.Semaphore(Config.MULTI_COMMAND_CONCURRENCY)
+    results = [None] * len(commands)
+    failures = []
+    groups = {}
+    show_list = False
+
+    for index, command in enumerate(commands):
+        logger.info(
+            "User intent %d/%d: %s (via %s)", index + 1, len(commands), command.get("intent"), command.get("source"),
+            extra={"sample": Config.LOG_SAMPLE_RATE},
+        )
+        logger.debug("Command data: %s", command.get("data"))
+        if command.get("intent") == "read":
+            show_list = True
+            results[index] = "📋 Task list below"
+        else:
+            groups.setdefault(command_group_key(command, index), []).append(index)
+
+    async def run_group(indexes):
+        for index in indexes:
+            async with slots:
+                try:
+                    results[index] = await execute_command(workspace, commands[index])
+                except Exception as e:
+                    logger.error("Command %d failed: %s", index + 1, e)
+                    failures.append(index)
+                    results[index] = f"❌ {commands[index].get('intent')} failed: {e}"
+
+    await asyncio.gather(*(run_group(indexes) for indexes in groups.values()))
+
+    summary = "\n".join(f"{i}. {line}" for i, line in enumerate(results, 1))
+    await reply_text(context, update.message, f"Ran {len(commands)} commands:\n\n{summary}")
+
+    if show_list:
+        tasks = notion_service.iter_pending_tasks(
+            sorts=pending_task_sorts(),
+            limit=Config.TASK_LIST_LIMIT or None,
+        )
+        await send_tasks_with_buttons(update, context, tasks, notion_service.mirror)
+    return "partial" if failures else "ok"
+
+async def queue_task_update(context, query, workspace, page_id, done_text, updates=None, snooze=None, due_hint=UNKNOWN, keep_keyboard=False):
+    """Hand a button's change to the write buffer and edit the message once it lands.
+
+    The handler returns right away, so further taps on the same task are
+    processed (and merged into the same write) while this one is pending.
+    In optimistic mode the message is first edited with the expected state,
+    computed from the cached task; if the write fails it is rolled back.
+    With `keep_keyboard` the task's buttons stay on the message.
+    """
+    write_buffer = workspace.write_buffer
+    future = write_buffer.submit(page_id, updates, snooze, due_hint)
+
+    def keyboard_for(task):
+        return create_task_keyboard(page_id, task=task) if keep_keyboard else None
+
+    optimistic_text = None
+    cached = workspace.notion_service.get_cached_task(page_id) if Config.OPTIMISTIC_UPDATES else None
+    if cached:
+        expected = write_buffer.preview(page_id, cached)
+        optimistic_text = f"{done_text}\n\n{format_task_details(expected)}"
+        await edit_message_text(context, query, optimistic_text, reply_markup=keyboard_for(expected), parse_mode="Markdown")
+
+    async def finish():
+        try:
+            result = await future
+            text = f"{done_text}\n\n{format_task_details(result)}"
+            # Only touch the message again if Notion disagrees with our guess
+            if text != optimistic_text:
+                await edit_message_text(context, query, text, reply_markup=keyboard_for(result), parse_mode="Markdown")
+        except Exception as e:
+            logger.error("Callback error: %s", e)
+            if cached:
+                await edit_message_text(
+                    context, query,
+                    f"⚠️ Could not save the change: {e}\n\n{format_task_details(cached)}",
+                    reply_markup=create_task_keyboard(page_id, task=cached),
+                    parse_mode="Markdown"
+                )
+            else:
+                await edit_message_text(context, query, f"Error performing action: {e}")
+
+    context.application.create_task(finish())
+
+def callback_action(data):
+    """Button kind of a callback ("done", "tl", "edit", ...) for metrics labels"""
+    return (data or "").split(":", 1)[0].split("_", 1)[0] or "none"
 
 async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        outcome = await process_callback(update, context) or "ok"
+    finally:
+        UPDATE_SECONDS.observe(time.perf_counter() - start, "callback", callback_action(update.callback_query.data), outcome)
+
+async def process_callback(update, context):
+    """Handle a button tap; returns "unauthorized" or "error" when it didn't go through"""
     query = update.callback_query
     await query.answer()
-    
+
+    workspace = await get_workspace(context, query.from_user)
+    if workspace is None:
+        return "unauthorized"
+
     data = query.data
-    notion_service = context.bot_data["notion_service"]
+    notion_service = workspace.notion_service
     
     try:
         # Handle different button actions
-        if data.startswith("done_"):
+        if data == "noop":
+            return
+
+        elif data.startswith("tl:"):
+            _, token, page_no = data.split(":")
+            tasks = get_task_list(context.chat_data, token)
+            if tasks is None:
+                await edit_message_text(context, query, "This list has expired. Send 'list' to get a fresh one.")
+                return
+            text, keyboard = render_task_list(tasks, token, int(page_no), mirror=notion_service.mirror)
+            await edit_message_text(context, query, text, reply_markup=keyboard, parse_mode="Markdown")
+
+        elif data.startswith("to:"):
+            _, token, index = data.split(":")
+            tasks = get_task_list(context.chat_data, token)
+            if tasks is None or int(index) >= len(tasks):
+                await edit_message_text(context, query, "This list has expired. Send 'list' to get a fresh one.")
+                return
+            task = current_task(tasks[int(index)], notion_service.mirror)
+            list_ref = f"{token}:{int(index) // Config.TASK_LIST_PAGE_SIZE}"
+            await edit_message_text(
+                context, query,
+                format_task_details(task),
+                reply_markup=create_task_keyboard(task.id, list_ref=list_ref, task=task),
+                parse_mode="Markdown"
+            )
+
+        elif data.startswith("done_"):
             page_id = data.replace("done_", "")
-            result = await notion_service.update_task(page_id, {"status": "Done"})
-            await query.edit_message_text(f"Task marked as Done!\n\n{format_task_details(result)}", parse_mode="Markdown")
+            await queue_task_update(context, query, workspace, page_id, "Task marked as Done!", {"status": "Done"})
         
         elif data.startswith("delete_"):
             page_id = data.replace("delete_", "")
-            await notion_service.delete_task(page_id)
-            await query.edit_message_text("Task deleted (archived).")
+            await workspace.write_buffer.delete(page_id)
+            await edit_message_text(context, query, "Task deleted (archived).")
         
-        elif data.startswith("snooze_"):
-            page_id = data.replace("snooze_", "")
-            task = await notion_service.get_task_by_id(page_id)
-            if task:
-                props = task["properties"]
-                current_date = None
-                
-                if props.get("Due Date") and props["Due Date"].get("date"):
-                    current_date = props["Due Date"]["date"]["start"]
-                
-                if not current_date:
-                    new_date = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
-                else:
-                    current = datetime.strptime(current_date, "%Y-%m-%d")
-                    new_date = (current + timedelta(days=1)).strftime("%Y-%m-%d")
-                
-                result = await notion_service.update_task(page_id, {"due_date": new_date})
-                await query.edit_message_text(f"Task postponed by 1 day!\n\n{format_task_details(result)}", parse_mode="Markdown")
+        elif data.startswith("snooze_") or data.startswith("sz:"):
+            # sz:<page_id>:<due hint> carries the due date; snooze_<page_id> is the older form
+            due_hint = UNKNOWN
+            if data.startswith("sz:"):
+                _, page_id, hint = data.split(":")
+                due_hint = decode_due(hint)
             else:
-                await query.edit_message_text("Task not found.")
+                page_id = data.replace("snooze_", "")
+            step = parse_snooze(Config.SNOOZE_AMOUNT)
+            await queue_task_update(
+                context, query, workspace, page_id, f"Task postponed {snooze_description(step)}!",
+                snooze=step, due_hint=due_hint, keep_keyboard=True
+            )
         
         elif data.startswith("edit_"):
             if data.startswith("edit_status_"):
                 page_id = data.replace("edit_status_", "")
                 task = await notion_service.get_task_by_id(page_id)
                 if task:
-                    await query.edit_message_text(
+                    await edit_message_text(
+                        context, query,
                         f"{format_task_details(task)}\n\n Select new status:",
                         reply_markup=create_status_keyboard(page_id),
                         parse_mode="Markdown"
@@ -216,7 +610,8 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 page_id = data.replace("edit_priority_", "")
                 task = await notion_service.get_task_by_id(page_id)
                 if task:
-                    await query.edit_message_text(
+                    await edit_message_text(
+                        context, query,
                         f"{format_task_details(task)}\n\n Select new priority:",
                         reply_markup=create_priority_keyboard(page_id),
                         parse_mode="Markdown"
@@ -224,7 +619,8 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             
             elif data.startswith("edit_date_"):
                 # page_id = data.replace("edit_date_", "") # Not used
-                await query.edit_message_text(
+                await edit_message_text(
+                    context, query,
                     "To change the due date, please type:\n\n"
                     "`change due date of [task name] to YYYY-MM-DD`\n\n"
                     "Example: change due date of Buy groceries to 2026-02-20",
@@ -233,7 +629,8 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             
             elif data.startswith("edit_name_"):
                 # page_id = data.replace("edit_name_", "") # Not used
-                await query.edit_message_text(
+                await edit_message_text(
+                    context, query,
                     "✏️ To rename the task, please type:\n\n"
                     "`rename [old task name] to [new name]`\n\n"
                     "Example: rename Buy groceries to Buy groceries and medicine",
@@ -245,7 +642,8 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 page_id = data.replace("edit_", "")
                 task = await notion_service.get_task_by_id(page_id)
                 if task:
-                    await query.edit_message_text(
+                    await edit_message_text(
+                        context, query,
                         f"{format_task_details(task)}\n\nWhat would you like to edit?",
                         reply_markup=create_edit_keyboard(page_id),
                         parse_mode="Markdown"
@@ -256,30 +654,60 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             status = parts[1]
             page_id = "_".join(parts[2:])
             
-            result = await notion_service.update_task(page_id, {"status": status})
-            await query.edit_message_text(f"Status updated!\n\n{format_task_details(result)}", parse_mode="Markdown")
+            await queue_task_update(context, query, workspace, page_id, "Status updated!", {"status": status})
         
         elif data.startswith("priority_"):
             parts = data.split("_")
             priority = parts[1]
             page_id = "_".join(parts[2:])
             
-            result = await notion_service.update_task(page_id, {"priority": priority})
-            await query.edit_message_text(f"Priority updated!\n\n{format_task_details(result)}", parse_mode="Markdown")
+            await queue_task_update(context, query, workspace, page_id, "Priority updated!", {"priority": priority})
         
+        elif data.startswith("pick_"):
+            _, token, page_id = data.split("_", 2)
+            action = context.user_data.get("pending_actions", {}).pop(token, None)
+            if page_id == "cancel":
+                await edit_message_text(context, query, "Cancelled.")
+            elif not action:
+                await edit_message_text(context, query, "This choice has expired. Please send the request again.")
+            else:
+                text = await apply_task_action(workspace, page_id, action)
+                await edit_message_text(context, query, text, parse_mode="Markdown" if action["intent"] == "update" else None)
+
+        elif data.startswith("bk:"):
+            _, token, choice = data.split(":")
+            action = context.user_data.get("pending_actions", {}).pop(token, None)
+            if choice == "no":
+                await edit_message_text(context, query, "Cancelled.")
+            elif not action:
+                await edit_message_text(context, query, "This confirmation has expired. Please send the request again.")
+            else:
+                plan = action["plan"]
+                tasks, more = await select_tasks(notion_service, plan[2])
+                if not tasks:
+                    await edit_message_text(context, query, f"No {describe_selection(plan[2])} left to change.")
+                    return
+                verb = "Deleting" if plan[0] == "delete" else "Updating"
+                await edit_message_text(context, query, f"⏳ {verb} {len(tasks)} {describe_selection(plan[2])}…")
+                failures = await run_bulk_with_progress(context, query.message, workspace, plan, tasks, more)
+                if failures:
+                    return "partial"
+
         elif data.startswith("back_"):
             page_id = data.replace("back_", "")
             task = await notion_service.get_task_by_id(page_id)
             if task:
-                await query.edit_message_text(
+                await edit_message_text(
+                    context, query,
                     format_task_details(task),
-                    reply_markup=create_task_keyboard(page_id),
+                    reply_markup=create_task_keyboard(page_id, task=task),
                     parse_mode="Markdown"
                 )
 
     except Exception as e:
-        logger.error(f"Callback error: {e}")
-        await query.edit_message_text(f"Error performing action: {e}")
+        logger.error("Callback error: %s", e)
+        await edit_message_text(context, query, f"Error performing action: {e}")
+        return "error"
 
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
     logger.error("Exception while handling an update:", exc_info=context.error)
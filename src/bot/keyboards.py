@@ -1,17 +1,31 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
-def create_task_keyboard(page_id):
-    """Create inline keyboard with action buttons for a task"""
+from src.config import Config
+from src.utils.dates import encode_due, parse_snooze, snooze_label
+
+def create_task_keyboard(page_id, list_ref=None, task=None):
+    """Create inline keyboard with action buttons for a task.
+
+    `list_ref` ("<token>:<page>") adds a button back to the list view the
+    task was opened from. When the `task` is given, its due date is encoded
+    into the snooze button (`sz:<page_id>:<hint>`) so snoozing needs no read.
+    """
+    snooze_data = f"snooze_{page_id}"
+    if task is not None:
+        snooze_data = f"sz:{page_id}:{encode_due(task.due)}"
+
     keyboard = [
         [
             InlineKeyboardButton("✅ Done", callback_data=f"done_{page_id}"),
             InlineKeyboardButton("📝 Edit", callback_data=f"edit_{page_id}"),
         ],
         [
-            InlineKeyboardButton("⏰ +1 Day", callback_data=f"snooze_{page_id}"),
+            InlineKeyboardButton(f"⏰ {snooze_label(parse_snooze(Config.SNOOZE_AMOUNT))}", callback_data=snooze_data),
             InlineKeyboardButton("🗑 Delete", callback_data=f"delete_{page_id}"),
         ]
     ]
+    if list_ref:
+        keyboard.append([InlineKeyboardButton("◀️ List", callback_data=f"tl:{list_ref}")])
     return InlineKeyboardMarkup(keyboard)
 
 def create_edit_keyboard(page_id):
@@ -50,3 +64,50 @@ def create_priority_keyboard(page_id):
         [InlineKeyboardButton("◀️ Back", callback_data=f"back_{page_id}")],
     ]
     return InlineKeyboardMarkup(keyboard)
+
+def create_disambiguation_keyboard(token, options):
+    """Create keyboard to choose between similarly named tasks.
+
+    `options` is a list of (label, page_id) pairs.
+    """
+    keyboard = [
+        [InlineKeyboardButton(label, callback_data=f"pick_{token}_{page_id}")]
+        for label, page_id in options
+    ]
+    keyboard.append([InlineKeyboardButton("✖️ Cancel", callback_data=f"pick_{token}_cancel")])
+    return InlineKeyboardMarkup(keyboard)
+
+def create_bulk_confirm_keyboard(token, label):
+    """Create keyboard to confirm (`bk:<token>:go`) or cancel a bulk change"""
+    keyboard = [[
+        InlineKeyboardButton(f"✅ {label}", callback_data=f"bk:{token}:go"),
+        InlineKeyboardButton("✖️ Cancel", callback_data=f"bk:{token}:no"),
+    ]]
+    return InlineKeyboardMarkup(keyboard)
+
+def create_task_list_keyboard(token, page_no, total_pages, entries):
+    """Create keyboard for one page of the task list view.
+
+    `entries` is a list of (index, label) pairs; tapping one opens that task
+    (`to:<token>:<index>`). Prev/next buttons (`tl:<token>:<page>`) edit the
+    same message in place.
+    """
+    keyboard = []
+    row = []
+    for index, label in entries:
+        row.append(InlineKeyboardButton(label, callback_data=f"to:{token}:{index}"))
+        if len(row) == 5:
+            keyboard.append(row)
+            row = []
+    if row:
+        keyboard.append(row)
+
+    if total_pages > 1:
+        nav = []
+        if page_no > 0:
+            nav.append(InlineKeyboardButton("◀️ Prev", callback_data=f"tl:{token}:{page_no - 1}"))
+        nav.append(InlineKeyboardButton(f"{page_no + 1}/{total_pages}", callback_data="noop"))
+        if page_no < total_pages - 1:
+            nav.append(InlineKeyboardButton("Next ▶️", callback_data=f"tl:{token}:{page_no + 1}"))
+        keyboard.append(nav)
+    return InlineKeyboardMarkup(keyboard)
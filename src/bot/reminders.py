@@ -0,0 +1,249 @@
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from src.bot.keyboards import create_task_keyboard
+from src.bot.sender import send_message
+from src.config import Config
+from src.utils.dates import due_timestamp, next_daily, parse_clock
+from src.utils.formatters import format_task_details, format_task_line
+from src.utils.logger import set_trace, setup_logger
+
+logger = setup_logger(__name__)
+
+# Longest the timer sleeps, so a wall-clock change is noticed within a minute
+MAX_SLEEP = 60
+# At startup, reminders that fell due this recently (e.g. during a redeploy) are still sent
+STARTUP_GRACE = 300
+# Tasks listed in one digest message
+DIGEST_LIMIT = 30
+# How long a sent reminder is remembered, so it isn't sent again
+SENT_RETENTION = 2 * 86400
+
+class ReminderScheduler:
+    """Sends a message when a task falls due, and an optional daily digest.
+
+    Every REMINDER_REFRESH_INTERVAL seconds, each tenant's open tasks due
+    before the next refresh are read with one query (or from the mirror) and
+    their due times pushed onto a heap. A single timer sleeps until the
+    earliest one, so thousands of tasks cost one wakeup per distinct due time.
+    Due times are wall-clock: the timer never sleeps longer than MAX_SLEEP, so
+    a clock change is picked up quickly, and each reminder is sent once.
+
+    A task with only a date is due at REMINDER_TIME in REMINDER_TIMEZONE.
+    Workspaces are never opened for this: idle tenants are read through
+    TenantPool.reader(), up to REMINDER_CONCURRENCY at a time, so they stay
+    idle and nobody is evicted. With a StateStore, sent reminders are saved
+    and reloaded at start, so a redeploy doesn't send them again.
+    """
+
+    def __init__(self, application, tenants):
+        self.application = application
+        self.tenants = tenants
+        self.store = tenants.store
+        self.tz = ZoneInfo(Config.REMINDER_TIMEZONE)
+        self.remind_at = parse_clock(Config.REMINDER_TIME)
+        self.digest_at = parse_clock(Config.DIGEST_TIME) if Config.DIGEST_TIME else None
+        self.interval = Config.REMINDER_REFRESH_INTERVAL
+        # (fire time, seq, kind, user id, page id); entries no longer in `scheduled` are skipped
+        self.heap = []
+        self.scheduled = {}  # (user id, page id) -> (fire time, due date, task)
+        self.sent = {}  # (user id, page id, due date) -> fire time
+        self._sent_loaded = False
+        self._seq = itertools.count()
+        self._cutoff = None  # reminders due before this were seen by an earlier refresh
+        self._wakeup = asyncio.Event()
+        self._loops = []
+        self._sending = set()
+        self.stats = {"refreshes": 0, "wakeups": 0, "reminders": 0, "digests": 0, "skipped": 0, "failed": 0}
+
+    def start(self):
+        if self._loops:
+            return
+        if self.digest_at is not None:
+            now = time.time()
+            for user_id in self.tenants.registry.tenants:
+                self._push(next_daily(self.digest_at, self.tz, now), "digest", user_id)
+        self._loops = [asyncio.create_task(self._refresh_loop()), asyncio.create_task(self._timer_loop())]
+        logger.info(
+            "Reminders on (refresh every %gs, date-only tasks at %s %s, digest %s)",
+            self.interval, Config.REMINDER_TIME, Config.REMINDER_TIMEZONE, Config.DIGEST_TIME or "off",
+        )
+
+    async def stop(self):
+        for task in self._loops:
+            task.cancel()
+        self._loops = []
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+        logger.info("Reminder scheduler stopped. Stats: %s", self.stats)
+
+    def _push(self, fire_at, kind, user_id, page_id=None):
+        if not self.heap or fire_at < self.heap[0][0]:
+            self._wakeup.set()  # earlier than what the timer is sleeping towards
+        heapq.heappush(self.heap, (fire_at, next(self._seq), kind, user_id, page_id))
+
+    async def _refresh_loop(self):
+        set_trace()
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Reminder refresh failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self):
+        """Schedule every reminder that falls due before the next refresh"""
+        now = time.time()
+        cutoff = now - STARTUP_GRACE if self._cutoff is None else self._cutoff
+        horizon = now + 2 * self.interval
+        until = datetime.fromtimestamp(horizon, self.tz).date().isoformat()
+
+        if self.store is not None and not self._sent_loaded:
+            # Reminders an earlier run sent within the startup grace period
+            self.sent.update(await self.store.load_reminders(cutoff))
+            self._sent_loaded = True
+
+        slots = asyncio.Semaphore(Config.REMINDER_CONCURRENCY)
+
+        async def refresh_user(user_id):
+            notion_service = self.tenants.reader(user_id)
+            if notion_service is None:
+                return
+            async with slots:
+                try:
+                    tasks = await notion_service.get_due_tasks(until)
+                except Exception as e:
+                    # Keep what was scheduled for this user until a refresh succeeds
+                    logger.warning("Could not read due tasks for %s: %s", user_id, e)
+                    return
+            self._schedule(user_id, tasks, cutoff, horizon)
+
+        await asyncio.gather(*(refresh_user(user_id) for user_id in list(self.tenants.registry.tenants)))
+
+        self._cutoff = now
+        self._compact(now)
+        self.stats["refreshes"] += 1
+
+    def _schedule(self, user_id, tasks, cutoff, horizon):
+        """Replace the user's scheduled reminders with those of `tasks` due in (cutoff, horizon]"""
+        live = {}
+        for task in tasks:
+            fire_at = due_timestamp(task.due, self.tz, self.remind_at)
+            if cutoff < fire_at <= horizon and (user_id, task.id, task.due) not in self.sent:
+                live[(user_id, task.id)] = (fire_at, task.due, task)
+
+        for key in [key for key in self.scheduled if key[0] == user_id and key not in live]:
+            del self.scheduled[key]
+        for key, entry in live.items():
+            current = self.scheduled.get(key)
+            self.scheduled[key] = entry
+            if current is None or current[0] != entry[0]:
+                self._push(entry[0], "task", *key)
+
+    def _compact(self, now):
+        """Drop heap entries that were rescheduled or cancelled, and old sent markers"""
+        if len(self.heap) > 2 * (len(self.scheduled) + len(self.tenants.registry)) + 64:
+            self.heap = [entry for entry in self.heap if entry[2] == "digest" or self._is_live(entry)]
+            heapq.heapify(self.heap)
+        expired = [key for key, fire_at in self.sent.items() if fire_at < now - SENT_RETENTION]
+        for key in expired:
+            del self.sent[key]
+        if expired and self.store is not None:
+            self.store.forget_reminders(now - SENT_RETENTION)
+
+    def _is_live(self, entry):
+        current = self.scheduled.get((entry[3], entry[4]))
+        return current is not None and current[0] == entry[0]
+
+    async def _timer_loop(self):
+        set_trace()
+        while True:
+            now = time.time()
+            while self.heap and self.heap[0][0] <= now:
+                self._fire(heapq.heappop(self.heap), now)
+            wait = MAX_SLEEP if not self.heap else min(self.heap[0][0] - now, MAX_SLEEP)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(wait, 0))
+            except asyncio.TimeoutError:
+                pass
+            self.stats["wakeups"] += 1
+
+    def _fire(self, entry, now):
+        fire_at, _, kind, user_id, page_id = entry
+        if kind == "digest":
+            self._push(next_daily(self.digest_at, self.tz, now), "digest", user_id)
+            self._spawn(self._send_digest(user_id))
+            return
+        if not self._is_live(entry):
+            return
+        _, due, task = self.scheduled.pop((user_id, page_id))
+        self.sent[(user_id, page_id, due)] = fire_at
+        if self.store is not None:
+            self.store.save_reminder(user_id, page_id, due, fire_at)
+        self._spawn(self._send_reminder(user_id, page_id, due, task))
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send_reminder(self, user_id, page_id, due, task):
+        try:
+            workspace = self.tenants.peek(user_id)
+            if workspace is not None:
+                # Latest known state, including button taps not yet written to Notion
+                task = workspace.notion_service.get_cached_task(page_id) or task
+                task = workspace.write_buffer.preview(page_id, task)
+            else:
+                notion_service = self.tenants.reader(user_id)
+                if notion_service is None:
+                    return
+                try:
+                    task = await notion_service.get_task_by_id(page_id) or task
+                except Exception as e:
+                    logger.warning("Could not re-check %s before reminding, sending the last copy: %s", page_id, e)
+            if task.archived or task.status == "Done" or task.due != due:
+                self.stats["skipped"] += 1
+                return
+
+            heading = "⏰ *Due today*" if len(due) <= 10 else "⏰ *Due now*"
+            await send_message(
+                self.application, user_id, f"{heading}\n\n{format_task_details(task)}",
+                reply_markup=create_task_keyboard(page_id, task=task), parse_mode="Markdown",
+            )
+            self.stats["reminders"] += 1
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error("Could not send reminder for %s to %s: %s", page_id, user_id, e)
+
+    async def _send_digest(self, user_id):
+        try:
+            notion_service = self.tenants.reader(user_id)
+            if notion_service is None:
+                return
+            today = datetime.now(self.tz).date().isoformat()
+            tasks = await notion_service.get_due_tasks(today)
+            if not tasks:
+                return
+            overdue = [task for task in tasks if task.due[:10] < today]
+            due_today = [task for task in tasks if task.due[:10] >= today]
+
+            lines = ["☀️ *Good morning!*"]
+            for title, group in (("Overdue", overdue), ("Due today", due_today)):
+                if group:
+                    lines.append(f"\n*{title}* ({len(group)})")
+                    lines.extend(format_task_line(task) for task in group[:DIGEST_LIMIT])
+                    if len(group) > DIGEST_LIMIT:
+                        lines.append(f"…and {len(group) - DIGEST_LIMIT} more")
+            await send_message(self.application, user_id, "\n".join(lines), parse_mode="Markdown")
+            self.stats["digests"] += 1
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error("Could not send the digest to %s: %s", user_id, e)
@@ -0,0 +1,214 @@
+import asyncio
+import time
+from collections import deque
+
+from telegram.error import RetryAfter
+
+from src.config import Config
+from src.utils.logger import setup_logger
+from src.utils.metrics import TELEGRAM_SEND_SECONDS
+from src.utils.rate_limiter import TokenBucket
+
+logger = setup_logger(__name__)
+
+class _Job:
+    __slots__ = ("func", "args", "kwargs", "futures", "coalesce_key")
+
+    def __init__(self, func, args, kwargs, future, coalesce_key):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.futures = [future]
+        self.coalesce_key = coalesce_key
+
+class _ChatQueue:
+    __slots__ = ("jobs", "bucket", "paused_until", "busy", "pending_keys")
+
+    def __init__(self):
+        self.jobs = deque()
+        self.bucket = TokenBucket(Config.TELEGRAM_CHAT_RATE, Config.TELEGRAM_CHAT_BURST)
+        self.paused_until = 0.0
+        self.busy = False
+        self.pending_keys = {}
+
+class SendScheduler:
+    """Queue for outbound Telegram calls.
+
+    Enforces a global and a per-chat send budget, keeps one call in flight per
+    chat so messages arrive in order, honours 429 retry_after, and merges
+    queued edits of the same message into the latest one. Chats are served
+    round-robin, so a long burst for one chat never delays another.
+    """
+
+    def __init__(self):
+        self.global_bucket = TokenBucket(Config.TELEGRAM_GLOBAL_RATE, Config.TELEGRAM_GLOBAL_RATE)
+        self.chats = {}
+        self.ready = deque()  # chat ids with queued jobs, in round-robin order
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._in_flight = set()
+        self._last_prune = time.monotonic()
+        self.stats = {"sent": 0, "coalesced": 0, "retry_after": 0, "failed": 0}
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout=10):
+        """Deliver what is already queued (up to `timeout` seconds), then stop"""
+        if self._task is None:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (self.ready or self._in_flight) and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        self._task.cancel()
+        self._task = None
+        for queue in self.chats.values():
+            for job in queue.jobs:
+                for future in job.futures:
+                    if not future.done():
+                        future.cancel()
+        logger.info("Send scheduler stopped. Stats: %s", self.stats)
+
+    def submit(self, chat_id, func, *args, coalesce_key=None, **kwargs):
+        """Queue `func(*args, **kwargs)` for `chat_id` and return a future for its result.
+
+        Jobs with the same `coalesce_key` that are still queued are merged:
+        only the newest call is made, and every caller gets its result.
+        """
+        future = asyncio.get_running_loop().create_future()
+        queue = self.chats.get(chat_id)
+        if queue is None:
+            queue = self.chats[chat_id] = _ChatQueue()
+
+        if coalesce_key is not None and coalesce_key in queue.pending_keys:
+            job = queue.pending_keys[coalesce_key]
+            job.func, job.args, job.kwargs = func, args, kwargs
+            job.futures.append(future)
+            self.stats["coalesced"] += 1
+            return future
+
+        job = _Job(func, args, kwargs, future, coalesce_key)
+        queue.jobs.append(job)
+        if coalesce_key is not None:
+            queue.pending_keys[coalesce_key] = job
+        if len(queue.jobs) == 1 and not queue.busy:
+            self.ready.append(chat_id)
+        self._wakeup.set()
+        return future
+
+    async def _run(self):
+        while True:
+            wait = self._dispatch()
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self):
+        """Start every job that fits the budgets; return seconds until the next check"""
+        now = time.monotonic()
+        if now - self._last_prune > 60:
+            self._prune(now)
+            self._last_prune = now
+        wait = None
+        for _ in range(len(self.ready)):
+            chat_id = self.ready.popleft()
+            queue = self.chats[chat_id]
+
+            delay = max(queue.paused_until - now, queue.bucket.delay(now), self.global_bucket.delay(now))
+            if delay > 0:
+                self.ready.append(chat_id)
+                wait = delay if wait is None else min(wait, delay)
+                continue
+
+            job = queue.jobs.popleft()
+            if job.coalesce_key is not None:
+                queue.pending_keys.pop(job.coalesce_key, None)
+            queue.bucket.take(now)
+            self.global_bucket.take(now)
+            queue.busy = True
+            task = asyncio.create_task(self._deliver(chat_id, queue, job))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+        return wait
+
+    async def _deliver(self, chat_id, queue, job):
+        method = getattr(job.func, "__name__", "call")
+        start = time.perf_counter()
+        try:
+            result = await job.func(*job.args, **job.kwargs)
+        except RetryAfter as e:
+            TELEGRAM_SEND_SECONDS.observe(time.perf_counter() - start, method, "retry_after")
+            self.stats["retry_after"] += 1
+            logger.warning("Telegram asked to retry after %ss (chat %s)", e.retry_after, chat_id)
+            queue.paused_until = time.monotonic() + float(e.retry_after)
+            queue.jobs.appendleft(job)
+            if job.coalesce_key is not None:
+                queue.pending_keys[job.coalesce_key] = job
+        except Exception as e:
+            TELEGRAM_SEND_SECONDS.observe(time.perf_counter() - start, method, "error")
+            self.stats["failed"] += 1
+            for future in job.futures:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            TELEGRAM_SEND_SECONDS.observe(time.perf_counter() - start, method, "ok")
+            self.stats["sent"] += 1
+            for future in job.futures:
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            queue.busy = False
+            if queue.jobs:
+                self.ready.append(chat_id)
+            self._wakeup.set()
+
+    def _prune(self, now):
+        """Forget idle chats whose budget has fully refilled, so memory stays flat"""
+        idle = [
+            chat_id for chat_id, queue in self.chats.items()
+            if not queue.jobs and not queue.busy and queue.bucket.delay(now) == 0
+            and queue.bucket.tokens >= queue.bucket.capacity
+        ]
+        for chat_id in idle:
+            del self.chats[chat_id]
+
+def _chat_id(message):
+    return message.chat_id if message is not None else None
+
+async def reply_text(context, message, text, **kwargs):
+    """Send a reply through the send scheduler (or directly if none is running)"""
+    sender = context.bot_data.get("sender")
+    if sender is None:
+        return await message.reply_text(text, **kwargs)
+    return await sender.submit(_chat_id(message), message.reply_text, text, **kwargs)
+
+async def edit_message_text(context, query, text, **kwargs):
+    """Edit a callback query's message through the send scheduler"""
+    sender = context.bot_data.get("sender")
+    if sender is None:
+        return await query.edit_message_text(text, **kwargs)
+    message = query.message
+    key = ("edit", message.chat_id, message.message_id) if message is not None else ("edit", query.inline_message_id)
+    return await sender.submit(_chat_id(message), query.edit_message_text, text, coalesce_key=key, **kwargs)
+
+async def edit_message(context, message, text, **kwargs):
+    """Edit a message we sent earlier through the send scheduler"""
+    sender = context.bot_data.get("sender")
+    if sender is None:
+        return await message.edit_text(text, **kwargs)
+    key = ("edit", message.chat_id, message.message_id)
+    return await sender.submit(message.chat_id, message.edit_text, text, coalesce_key=key, **kwargs)
+
+async def send_message(context, chat_id, text, **kwargs):
+    """Send a new message (not a reply) to `chat_id` through the send scheduler.
+
+    `context` may also be the Application, for messages the bot starts itself.
+    """
+    sender = context.bot_data.get("sender")
+    if sender is None:
+        return await context.bot.send_message(chat_id, text, **kwargs)
+    return await sender.submit(chat_id, context.bot.send_message, chat_id, text, **kwargs)
@@ -0,0 +1,41 @@
+import secrets
+
+from src.config import Config
+from src.utils.formatters import format_task_line
+from src.bot.keyboards import create_task_list_keyboard
+
+def store_task_list(chat_data, tasks):
+    """Keep a fetched task list so paging and opening tasks need no new query"""
+    lists = chat_data.setdefault("task_lists", {})
+    while len(lists) >= Config.MAX_TASK_LISTS:
+        lists.pop(next(iter(lists)))
+    token = secrets.token_hex(3)
+    lists[token] = tasks
+    return token
+
+def get_task_list(chat_data, token):
+    return chat_data.get("task_lists", {}).get(token)
+
+def current_task(task, mirror=None):
+    """Prefer the mirror's copy, which reflects edits made since the list was fetched"""
+    if mirror is not None:
+        return mirror.get(task.id) or task
+    return task
+
+def render_task_list(tasks, token, page_no, complete=True, mirror=None):
+    """Return (text, keyboard) for one page of a stored task list"""
+    size = Config.TASK_LIST_PAGE_SIZE
+    total_pages = max(1, -(-len(tasks) // size))
+    page_no = min(max(page_no, 0), total_pages - 1)
+    start = page_no * size
+
+    count = f"{len(tasks)}" if complete else f"{len(tasks)}+"
+    lines = [f"*Pending Tasks:* ({count} total)", ""]
+    entries = []
+    for index, task in enumerate(tasks[start:start + size], start):
+        task = current_task(task, mirror)
+        lines.append(f"{index + 1}. {format_task_line(task)}")
+        entries.append((index, f"#{task.unique_id or 'N/A'}"))
+
+    keyboard = create_task_list_keyboard(token, page_no, total_pages, entries)
+    return "\n".join(lines), keyboard
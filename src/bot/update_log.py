@@ -0,0 +1,77 @@
+import asyncio
+import json
+import time
+
+from src.config import Config
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class UpdateRecorder:
+    """Append incoming updates to a JSONL log for later replay.
+
+    Each line is {"t": arrival time (epoch seconds), "update": raw update}.
+    Lines are buffered in memory and written from a worker thread every
+    `flush_interval` seconds, so recording never blocks the event loop on disk.
+    """
+
+    def __init__(self, path, flush_interval=None):
+        self.path = path
+        self.flush_interval = flush_interval or Config.UPDATE_LOG_FLUSH_INTERVAL
+        self.buffer = []
+        self._file = None
+        self._task = None
+        self._lock = asyncio.Lock()  # one write at a time
+        self.stats = {"recorded": 0, "flushes": 0}
+
+    def start(self):
+        if self._task is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+            self._task = asyncio.create_task(self._flush_loop())
+            logger.info("Recording updates to %s", self.path)
+
+    def record(self, update):
+        data = update.to_dict() if hasattr(update, "to_dict") else update
+        self.buffer.append(json.dumps({"t": round(time.time(), 3), "update": data}, separators=(",", ":")))
+        self.stats["recorded"] += 1
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        if not self.buffer or self._file is None:
+            return
+        # Shielded so cancelling the flush loop never abandons a write half-way
+        await asyncio.shield(self._flush())
+
+    async def _flush(self):
+        async with self._lock:
+            lines, self.buffer = self.buffer, []
+            if lines:
+                await asyncio.to_thread(self._write, lines)
+                self.stats["flushes"] += 1
+
+    def _write(self, lines):
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        logger.info("Update log closed. Stats: %s", self.stats)
+
+def read_update_log(path):
+    """Yield (arrival time, raw update) pairs from a log written by UpdateRecorder"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entry = json.loads(line)
+                yield entry["t"], entry["update"]
@@ -0,0 +1,134 @@
+import asyncio
+import hmac
+import signal
+
+from aiohttp import web
+from telegram import Update
+
+from src.config import Config
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+class WebhookServer:
+    """aiohttp server that receives Telegram updates and hands them to the Application.
+
+    Updates are acknowledged as soon as they are queued; the Application's own
+    update fetcher runs the registered handlers. While draining, new updates are
+    refused with 503 so Telegram redelivers them to a healthy instance. Posts
+    without the secret token are refused with 403; with no secret configured,
+    every post is.
+    """
+
+    def __init__(self, application, path=None, secret_token=None):
+        self.application = application
+        self.path = path or Config.WEBHOOK_PATH
+        self.secret_token = Config.WEBHOOK_SECRET if secret_token is None else secret_token
+        self.draining = False
+        self._runner = None
+        self.stats = {"received": 0, "rejected": 0, "invalid": 0}
+
+    def build_app(self):
+        web_app = web.Application()
+        web_app.router.add_post(self.path, self.handle_update)
+        web_app.router.add_get("/healthz", self.handle_health)
+        return web_app
+
+    async def handle_update(self, request):
+        if not self.secret_token or not hmac.compare_digest(
+            request.headers.get(SECRET_HEADER, ""), self.secret_token
+        ):
+            self.stats["rejected"] += 1
+            return web.Response(status=403)
+        if self.draining or not self.application.running:
+            return web.Response(status=503)
+
+        try:
+            data = await request.json()
+            update = Update.de_json(data, self.application.bot)
+        except Exception as e:
+            self.stats["invalid"] += 1
+            logger.warning("Ignoring malformed webhook payload: %s", e)
+            return web.Response(status=400)
+        if update is None:
+            self.stats["invalid"] += 1
+            return web.Response(status=400)
+
+        self.stats["received"] += 1
+        await self.application.update_queue.put(update)
+        return web.Response()
+
+    async def handle_health(self, request):
+        healthy = self.application.running and not self.draining
+        body = {
+            "status": "ok" if healthy else "draining" if self.draining else "starting",
+            "pending_updates": self.application.update_queue.qsize(),
+            **self.stats,
+        }
+        return web.json_response(body, status=200 if healthy else 503)
+
+    async def start(self, host=None, port=None):
+        self._runner = web.AppRunner(self.build_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host or Config.WEBHOOK_LISTEN, port or Config.WEBHOOK_PORT)
+        await site.start()
+        logger.info("Webhook server listening on %s%s", site.name, self.path)
+
+    async def drain(self, timeout=None):
+        """Refuse new updates and wait for the queued ones to be handled"""
+        self.draining = True
+        timeout = Config.WEBHOOK_DRAIN_TIMEOUT if timeout is None else timeout
+        try:
+            await asyncio.wait_for(self.application.update_queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Drain timed out with %d updates still queued", self.application.update_queue.qsize())
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+async def run_webhook(application):
+    """Serve `application` over a webhook until SIGINT/SIGTERM, then drain and shut down.
+
+    Mirrors the lifecycle of `Application.run_polling`, so `post_init` and
+    `post_shutdown` run exactly as they do in polling mode.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    server = WebhookServer(application)
+    await application.initialize()
+    try:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        await server.start()
+        if Config.WEBHOOK_URL:
+            await application.bot.set_webhook(
+                url=Config.WEBHOOK_URL.rstrip("/") + server.path,
+                secret_token=server.secret_token,
+                allowed_updates=Update.ALL_TYPES,
+            )
+            logger.info("Webhook registered with Telegram at %s", Config.WEBHOOK_URL)
+        else:
+            logger.info("WEBHOOK_URL not set; not registering the webhook with Telegram")
+
+        await stop.wait()
+        logger.info("Shutting down: draining pending updates...")
+        await server.drain()
+    finally:
+        await server.stop()
+        if application.running:
+            await application.stop()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+        await application.shutdown()
+        logger.info("Webhook server stopped. Stats: %s", server.stats)
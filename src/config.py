@@ -1,5 +1,7 @@
 import os
 from dotenv import load_dotenv
+from zoneinfo import ZoneInfo
+from src.utils.dates import parse_clock, parse_snooze
 
 load_dotenv()
 
@@ -8,16 +10,142 @@ class Config:
     NOTION_KEY = os.getenv("NOTION_KEY")
     DATABASE_ID = os.getenv("DATABASE_ID")
     GEMINI_KEY = os.getenv("GEMINI_KEY")
+    GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "")  # empty = Google's endpoint
     AUTHORIZED_USER_ID = int(os.getenv("TELEGRAM_USERID", 0))
+    TELEGRAM_BASE_URL = os.getenv("TELEGRAM_BASE_URL", "https://api.telegram.org/bot")
+
+    # State kept across restarts (handled update ids, unsent writes, task mirrors)
+    STATE_FILE = os.getenv("STATE_FILE", "")  # sqlite database path; empty = keep nothing
+    STATE_COMMIT_INTERVAL = float(os.getenv("STATE_COMMIT_INTERVAL", 1))  # seconds between commits
+    STATE_UPDATE_RETENTION = float(os.getenv("STATE_UPDATE_RETENTION", 86400))  # Telegram keeps updates 24h
+
+    # Due-date reminders and the morning digest
+    REMINDERS_ENABLED = os.getenv("REMINDERS_ENABLED", "true").lower() == "true"
+    REMINDER_TIME = os.getenv("REMINDER_TIME", "09:00")  # when tasks with only a date are due
+    REMINDER_TIMEZONE = os.getenv("REMINDER_TIMEZONE", "UTC")
+    REMINDER_REFRESH_INTERVAL = float(os.getenv("REMINDER_REFRESH_INTERVAL", 300))  # seconds between due-task reads
+    REMINDER_CONCURRENCY = int(os.getenv("REMINDER_CONCURRENCY", 4))  # users' due tasks read at once
+    DIGEST_TIME = os.getenv("DIGEST_TIME", "")  # e.g. "08:00"; empty = no digest
+
+    # Startup: fail instead of starting when the Notion or Gemini check fails
+    STARTUP_STRICT = os.getenv("STARTUP_STRICT", "false").lower() == "true"
+
+    # Logging
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")  # for the bot's own loggers
+    LOG_LEVELS = os.getenv("LOG_LEVELS", "")  # per logger, e.g. "src.services=DEBUG,httpx=INFO"
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # "text" or "json"
+    LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 1))  # share of per-request lines written
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))  # lines waiting for stdout before dropping
+
+    # How updates are received: "polling" or "webhook"
+    BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # public base URL; empty = don't register with Telegram
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+    WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8080))
+    WEBHOOK_DRAIN_TIMEOUT = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", 25))
+
+    # Handlers running at once; updates from one chat are still handled in order
+    UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", 8))
+
+    # Metrics: Prometheus endpoint and/or a periodic latency summary in the logs
+    METRICS_PORT = int(os.getenv("METRICS_PORT", 0))  # 0 = no endpoint
+    METRICS_LISTEN = os.getenv("METRICS_LISTEN", "127.0.0.1")
+    METRICS_LOG_INTERVAL = float(os.getenv("METRICS_LOG_INTERVAL", 0))  # seconds; 0 = off
+
+    # Capture incoming updates for replay (contains message text; keep it private)
+    UPDATE_LOG_FILE = os.getenv("UPDATE_LOG_FILE", "")  # JSONL path; empty = off
+    UPDATE_LOG_FLUSH_INTERVAL = float(os.getenv("UPDATE_LOG_FLUSH_INTERVAL", 1))
+
+    # Multi-tenant mode: one bot serving several users, each with their own Notion database
+    TENANTS_FILE = os.getenv("TENANTS_FILE", "")  # JSON file or sqlite database; empty = single user
+    TENANT_CACHE_SIZE = int(os.getenv("TENANT_CACHE_SIZE", 100))  # tenants kept open (mirror, sync loop)
+    TENANT_MAX_CONCURRENCY = int(os.getenv("TENANT_MAX_CONCURRENCY", 4))  # handlers per user at once
+
+    # Notion HTTP connection pool
+    NOTION_BASE_URL = os.getenv("NOTION_BASE_URL", "https://api.notion.com/v1")
+    NOTION_HTTP2 = os.getenv("NOTION_HTTP2", "true").lower() == "true"
+    NOTION_MAX_CONNECTIONS = int(os.getenv("NOTION_MAX_CONNECTIONS", 10))
+    NOTION_MAX_KEEPALIVE = int(os.getenv("NOTION_MAX_KEEPALIVE", 5))
+    NOTION_KEEPALIVE_EXPIRY = float(os.getenv("NOTION_KEEPALIVE_EXPIRY", 60))
+    NOTION_PAGE_SIZE = int(os.getenv("NOTION_PAGE_SIZE", 100))
+    NOTION_RATE_LIMIT = float(os.getenv("NOTION_RATE_LIMIT", 3))  # requests per second
+    NOTION_RATE_BURST = int(os.getenv("NOTION_RATE_BURST", 3))
+    NOTION_MAX_RETRIES = int(os.getenv("NOTION_MAX_RETRIES", 3))  # retries after a 429
+
+    # Local task mirror
+    MIRROR_ENABLED = os.getenv("MIRROR_ENABLED", "true").lower() == "true"
+    MIRROR_MAX_AGE = float(os.getenv("MIRROR_MAX_AGE", 30))
+    MIRROR_SYNC_INTERVAL = float(os.getenv("MIRROR_SYNC_INTERVAL", 20))  # 0 = sync on demand only
+    MIRROR_FULL_RESYNC_INTERVAL = float(os.getenv("MIRROR_FULL_RESYNC_INTERVAL", 3600))
+
+    # Intent parsing
+    FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+    AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", 4))
+    AI_MAX_CONCURRENCY_PER_USER = int(os.getenv("AI_MAX_CONCURRENCY_PER_USER", 2))  # kept below AI_MAX_CONCURRENCY
+    AI_DEADLINE = float(os.getenv("AI_DEADLINE", 20))
+    AI_MAX_ATTEMPTS = int(os.getenv("AI_MAX_ATTEMPTS", 3))
+    AI_BACKOFF_BASE = float(os.getenv("AI_BACKOFF_BASE", 0.5))
+    AI_BACKOFF_MAX = float(os.getenv("AI_BACKOFF_MAX", 4))
+
+    # Multi-command messages
+    MAX_COMMANDS_PER_MESSAGE = int(os.getenv("MAX_COMMANDS_PER_MESSAGE", 10))
+    MULTI_COMMAND_CONCURRENCY = int(os.getenv("MULTI_COMMAND_CONCURRENCY", 3))
+
+    # Outbound Telegram rate limits (Telegram allows ~30 msg/s overall, ~1 msg/s per chat)
+    TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", 30))
+    TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", 1))
+    TELEGRAM_CHAT_BURST = int(os.getenv("TELEGRAM_CHAT_BURST", 3))
+
+    # Task name resolution
+    TASK_MATCH_MIN_SCORE = float(os.getenv("TASK_MATCH_MIN_SCORE", 0.35))
+    TASK_MATCH_MARGIN = float(os.getenv("TASK_MATCH_MARGIN", 0.1))
+
+    # Write-behind buffer for button edits
+    WRITE_COALESCE_WINDOW = float(os.getenv("WRITE_COALESCE_WINDOW", 0.75))
+    OPTIMISTIC_UPDATES = os.getenv("OPTIMISTIC_UPDATES", "true").lower() == "true"
+    SNOOZE_AMOUNT = os.getenv("SNOOZE_AMOUNT", "1d")  # e.g. "1d", "3h", "next monday"
+
+    # Bulk changes ("mark all overdue tasks done")
+    BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", 3))  # Notion writes in flight at once
+    BULK_MAX_TASKS = int(os.getenv("BULK_MAX_TASKS", 200))  # tasks one command may change
+
+    # Task listing
+    TASK_LIST_LIMIT = int(os.getenv("TASK_LIST_LIMIT", 0))  # 0 = no cap
+    TASK_LIST_SORT = os.getenv("TASK_LIST_SORT", "")  # property to sort ascending by, e.g. "Due Date"
+    TASK_LIST_PAGE_SIZE = int(os.getenv("TASK_LIST_PAGE_SIZE", 10))
+    MAX_TASK_LISTS = int(os.getenv("MAX_TASK_LISTS", 5))  # list views kept per chat for paging
 
     @classmethod
     def validate(cls):
         missing = []
         if not cls.TELEGRAM_TOKEN: missing.append("TELEGRAM_TOKEN")
-        if not cls.NOTION_KEY: missing.append("NOTION_KEY")
-        if not cls.DATABASE_ID: missing.append("DATABASE_ID")
         if not cls.GEMINI_KEY: missing.append("GEMINI_KEY")
-        if not cls.AUTHORIZED_USER_ID: missing.append("TELEGRAM_USERID")
+        if not cls.TENANTS_FILE:
+            if not cls.NOTION_KEY: missing.append("NOTION_KEY")
+            if not cls.DATABASE_ID: missing.append("DATABASE_ID")
+            if not cls.AUTHORIZED_USER_ID: missing.append("TELEGRAM_USERID")
         
         if missing:
             raise ValueError(f"Missing environment variables: {', '.join(missing)}")
+
+        if cls.BOT_MODE not in ("polling", "webhook"):
+            raise ValueError(f"BOT_MODE must be 'polling' or 'webhook', got {cls.BOT_MODE!r}")
+        if cls.BOT_MODE == "webhook" and not cls.WEBHOOK_SECRET:
+            raise ValueError("WEBHOOK_SECRET is required when BOT_MODE is 'webhook'")
+
+        if cls.LOG_FORMAT not in ("text", "json"):
+            raise ValueError(f"LOG_FORMAT must be 'text' or 'json', got {cls.LOG_FORMAT!r}")
+
+        if cls.REMINDERS_ENABLED:
+            parse_clock(cls.REMINDER_TIME)
+            if cls.DIGEST_TIME:
+                parse_clock(cls.DIGEST_TIME)
+            try:
+                ZoneInfo(cls.REMINDER_TIMEZONE)
+            except (KeyError, ValueError) as e:
+                raise ValueError(f"Unknown REMINDER_TIMEZONE {cls.REMINDER_TIMEZONE!r}") from e
+
+        # Raises ValueError with the offending value if SNOOZE_AMOUNT is malformed
+        parse_snooze(cls.SNOOZE_AMOUNT)
@@ -1,47 +1,157 @@
+import time
+
+STARTED = time.perf_counter()  # before the imports below, so time to ready includes them
+
+import asyncio
+import sqlite3
+
 from telegram.ext import ApplicationBuilder, MessageHandler, CallbackQueryHandler, filters
 from src.config import Config
-from src.services.notion_service import NotionService
 from src.services.ai_service import AIService
+from src.services.state_store import StateStore
+from src.services.tenants import TenantPool, TenantRegistry
 from src.bot.handlers import handle_message, handle_callback, error_handler
+from src.bot.application import OrderedApplication
+from src.bot.reminders import ReminderScheduler
+from src.bot.sender import SendScheduler
+from src.bot.update_log import UpdateRecorder
 from src.utils.logger import setup_logger
+from src.utils.metrics import log_metrics, serve_metrics
 
 logger = setup_logger(__name__)
 
-def main():
-    # Validate configuration
-    try:
-        Config.validate()
-    except ValueError as e:
-        logger.error(f"Configuration error: {e}")
+IMPORTED = time.perf_counter()
+
+async def warm_up(app):
+    """Check credentials and fill caches for Notion and Gemini at once, while the bot logs in.
+
+    A failed check is logged and the bot starts anyway (Notion or Gemini may
+    only be briefly unreachable), unless STARTUP_STRICT is set.
+    """
+    steps = {
+        "notion": app.bot_data["tenants"].warm_up(),
+        "gemini": app.bot_data["ai_service"].warm_up(),
+    }
+
+    async def timed(name, step):
+        start = time.perf_counter()
+        try:
+            await step
+        except Exception as e:
+            if Config.STARTUP_STRICT:
+                raise RuntimeError(f"{name} startup check failed: {e}") from e
+            logger.error("%s startup check failed: %s", name.capitalize(), e)
+        finally:
+            app.startup_times[name] = time.perf_counter() - start
+
+    await asyncio.gather(*(timed(name, step) for name, step in steps.items()))
+
+async def post_init(app):
+    """Open long-lived service resources once the Application is up"""
+    await app.bot_data["tenants"].start()
+    app.bot_data["sender"] = SendScheduler()
+    app.bot_data["sender"].start()
+    if app.update_recorder is not None:
+        app.update_recorder.start()
+    if Config.REMINDERS_ENABLED:
+        app.bot_data["reminders"] = ReminderScheduler(app, app.bot_data["tenants"])
+        app.bot_data["reminders"].start()
+    if Config.METRICS_PORT:
+        app.bot_data["metrics_runner"] = await serve_metrics(Config.METRICS_LISTEN, Config.METRICS_PORT)
+    if Config.METRICS_LOG_INTERVAL:
+        app.bot_data["metrics_task"] = asyncio.create_task(log_metrics(Config.METRICS_LOG_INTERVAL))
+
+    steps = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in app.startup_times.items())
+    logger.info(
+        "Ready in %.2fs (imports %.2fs; %s)",
+        time.perf_counter() - STARTED, IMPORTED - STARTED, steps or "no warm-up",
+    )
+
+async def stop_services(app):
+    """Wind the services down while the bot can still send (run by Application.stop)"""
+    if app.bot_data.get("services_stopped"):
         return
+    app.bot_data["services_stopped"] = True
+    if "reminders" in app.bot_data:
+        await app.bot_data["reminders"].stop()
+    # Flush buffered writes first: their confirmations still go out through the sender
+    await app.bot_data["tenants"].close()
+    if "sender" in app.bot_data:
+        await app.bot_data["sender"].stop()
 
-    # Initialize Services
-    notion_service = NotionService()
-    ai_service = AIService()
+async def post_shutdown(app):
+    """Release what is left once the Application has shut down"""
+    await stop_services(app)  # if the Application never got to stop()
+    if app.update_recorder is not None:
+        await app.update_recorder.close()
+    if "metrics_task" in app.bot_data:
+        app.bot_data["metrics_task"].cancel()
+    if "metrics_runner" in app.bot_data:
+        await app.bot_data["metrics_runner"].cleanup()
+
+def build_application(tenants, ai_service, updater=True):
+    """Build the Application with services injected and handlers registered.
 
-    # Build Application
-    app = (
+    `updater=False` builds it without a getUpdates poller, for webhook mode
+    and for feeding updates in directly (benchmarks, replays).
+    """
+    builder = (
         ApplicationBuilder()
+        .application_class(OrderedApplication)
         .token(Config.TELEGRAM_TOKEN)
+        .base_url(Config.TELEGRAM_BASE_URL)
         .get_updates_connect_timeout(30)
         .get_updates_read_timeout(30)
         .read_timeout(30)
         .write_timeout(30)
         .connect_timeout(30)
-        .build()
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
     )
+    if not updater:
+        builder = builder.updater(None)
+    app = builder.build()
 
     # Inject Services into Bot Data
-    app.bot_data["notion_service"] = notion_service
+    app.bot_data["tenants"] = tenants
     app.bot_data["ai_service"] = ai_service
 
+    app.warm_up = warm_up
+    app.stop_services = stop_services
+    app.state_store = tenants.store
+    if Config.UPDATE_LOG_FILE:
+        app.update_recorder = UpdateRecorder(Config.UPDATE_LOG_FILE)
+
     # Register Handlers
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
     app.add_handler(CallbackQueryHandler(handle_callback))
     app.add_error_handler(error_handler)
+    return app
+
+def main():
+    # Validate configuration
+    try:
+        Config.validate()
+    except ValueError as e:
+        logger.error("Configuration error: %s", e)
+        return
+
+    # Initialize Services
+    try:
+        store = StateStore(Config.STATE_FILE) if Config.STATE_FILE else None
+        tenants = TenantPool(TenantRegistry.from_config(), store=store)
+    except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+        logger.error("Could not load tenants from %s: %s", Config.TENANTS_FILE, e)
+        return
+    app = build_application(tenants, AIService(), updater=Config.BOT_MODE == "polling")
+
+    logger.info("Bot is starting in %s mode...", Config.BOT_MODE)
+    if Config.BOT_MODE == "webhook":
+        from src.bot.webhook import run_webhook  # aiohttp is only needed in webhook mode
 
-    logger.info("Bot is starting...")
-    app.run_polling()
+        asyncio.run(run_webhook(app))
+    else:
+        app.run_polling()
 
 if __name__ == "__main__":
     main()
@@ -1,22 +1,161 @@
-from google import genai
-from datetime import datetime
+import asyncio
 import json
+import random
 import time
 from src.config import Config
+from src.services.intent_parser import parse_fast
+from src.utils.dates import local_today
 from src.utils.formatters import clean_json
 from src.utils.logger import setup_logger
+from src.utils.metrics import AI_PARSE_SECONDS, intent_label
 
 logger = setup_logger(__name__)
 
+MODEL = "gemini-2.5-flash"
+
+def content_preview(value, limit=200):
+    text = json.dumps(value)
+    return text if len(text) <= limit else text[:limit] + "..."
+
 class AIService:
     def __init__(self):
-        self.client = genai.Client(api_key=Config.GEMINI_KEY)
+        self._client = None
+        # How many messages were answered by each parser
+        self.stats = {"fast_path": 0, "llm": 0}
+        # Caps concurrent in-flight Gemini calls
+        self._llm_slots = asyncio.Semaphore(Config.AI_MAX_CONCURRENCY)
+        # ...and per user, below the global cap, so one busy user can't take every slot
+        self.per_user = max(1, min(Config.AI_MAX_CONCURRENCY_PER_USER, Config.AI_MAX_CONCURRENCY - 1))
+        self._users = {}  # user id -> [semaphore, number of calls using it]
+
+    @property
+    def client(self):
+        """Gemini client, created on first use.
+
+        The SDK takes the better part of a second to import, and messages the
+        local parser understands never need it.
+        """
+        if self._client is None:
+            from google import genai
+
+            http_options = {"base_url": Config.GEMINI_BASE_URL} if Config.GEMINI_BASE_URL else None
+            self._client = genai.Client(api_key=Config.GEMINI_KEY, http_options=http_options)
+        return self._client
+
+    async def warm_up(self):
+        """Load the SDK off the event loop and check the API key by looking up the model"""
+        client = await asyncio.to_thread(lambda: self.client)
+        await client.aio.models.get(model=MODEL)
+
+    async def parse_commands_async(self, user_text, user_id=None):
+        """Parse a message into a list of {"intent", "data", "source"} commands.
+
+        Common commands are handled by the local rule-based parser; only the
+        rest goes to Gemini, and several commands in one message are extracted
+        by a single call. Each command's "source" says which one answered.
 
-    def parse_intent(self, user_text):
-        """Parse natural language input into intent and data"""
-        today = datetime.utcnow().strftime("%Y-%m-%d")
+        Gemini calls are bounded by AI_MAX_CONCURRENCY (and, for `user_id`, by
+        AI_MAX_CONCURRENCY_PER_USER), retried with exponential backoff plus
+        jitter, and the whole parse (including waiting for a free slot) must
+        finish within AI_DEADLINE seconds.
+        """
+        start = time.perf_counter()
+        commands, outcome = [], "error"
+        try:
+            commands = await self._parse_commands_async(user_text, user_id)
+            outcome = "ok" if commands else "empty"
+            return commands
+        finally:
+            self._observe(start, commands, outcome)
+
+    def _observe(self, start, commands, outcome):
+        source = commands[0]["source"] if commands else "llm"
+        AI_PARSE_SECONDS.observe(time.perf_counter() - start, source, intent_label(commands), outcome)
+
+    async def _parse_commands_async(self, user_text, user_id=None):
+        if Config.FAST_PATH_ENABLED:
+            result = parse_fast(user_text)
+            if result:
+                self.stats["fast_path"] += 1
+                return [result]
+
+        self.stats["llm"] += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + Config.AI_DEADLINE
+        prompt = self._build_prompt(user_text)
+
+        for attempt in range(Config.AI_MAX_ATTEMPTS):
+            remaining = deadline - loop.time()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                response = await asyncio.wait_for(self._generate_async(prompt, user_id), timeout=remaining)
+                return self._decode(response)
+            except asyncio.TimeoutError:
+                logger.error("AI parsing exceeded the %ss deadline", Config.AI_DEADLINE)
+                raise TimeoutError(f"AI did not answer within {Config.AI_DEADLINE:g}s")
+            except Exception as e:
+                logger.warning("AI Attempt %d failed: %s", attempt + 1, e)
+                # Full jitter: sleep a random amount up to the exponential cap
+                delay = random.uniform(0, min(Config.AI_BACKOFF_MAX, Config.AI_BACKOFF_BASE * 2 ** attempt))
+                if attempt == Config.AI_MAX_ATTEMPTS - 1 or loop.time() + delay >= deadline:
+                    logger.error("Failed to process with AI after %d attempts: %s", attempt + 1, e)
+                    raise e
+                await asyncio.sleep(delay)
+
+        return []
+
+    async def _generate_async(self, prompt, user_id=None):
+        if user_id is None:
+            async with self._llm_slots:
+                return await self._generate(prompt)
+
+        slot = self._users.setdefault(user_id, [asyncio.Semaphore(self.per_user), 0])
+        slot[1] += 1
+        try:
+            # The user's own slot first, so their queued calls don't hold global ones
+            async with slot[0], self._llm_slots:
+                return await self._generate(prompt)
+        finally:
+            slot[1] -= 1
+            if slot[1] == 0:
+                self._users.pop(user_id, None)
+
+    async def _generate(self, prompt):
+        return await self.client.aio.models.generate_content(
+            model=MODEL,
+            contents=prompt,
+            config={
+                "response_mime_type": "application/json"
+            }
+        )
+
+    def _decode(self, response):
+        """Turn a Gemini response into a list of commands.
+
+        Accepts {"commands": [...]}, a bare list, and the older single
+        {"intent", "data"} object.
+        """
+        result = json.loads(clean_json(response.text))
+        if isinstance(result, dict) and isinstance(result.get("commands"), list):
+            items = result["commands"]
+        elif isinstance(result, list):
+            items = result
+        elif isinstance(result, dict) and "intent" in result:
+            items = [result]
+        else:
+            raise ValueError(f"Unexpected AI response shape: {content_preview(result)}")
+
+        return [
+            {"intent": item.get("intent"), "data": item.get("data") or {}, "source": "llm"}
+            for item in items
+            if isinstance(item, dict) and item.get("intent")
+        ]
+
+    def _build_prompt(self, user_text):
+        today = local_today(Config.REMINDER_TIMEZONE).isoformat()
         
-        prompt = f"""
+        return f"""
         Today's date is: {today}
 
         You are a task management assistant. Your job is to extract the intent and relevant data from the user's natural language input.
@@ -26,6 +165,7 @@ class AIService:
         - "read": Read/List pending tasks.
         - "update": Update an existing task (change status, priority, due date, or rename).
         - "delete": Delete/Archive a task.
+        - "bulk": Change or delete every task matching a condition (e.g. "mark all overdue tasks done").
 
         Rules for "create":
         - Extract "title", "status" (default: "Pending"), "priority" (default: "Medium"), "due_date" (YYYY-MM-DD or null), "description".
@@ -42,45 +182,42 @@ class AIService:
         Rules for "delete":
         - Extract "target_task_name" OR "target_task_id".
 
+        Rules for "bulk":
+        - Use only when the user refers to a group of tasks ("all", "every", "everything"), not named tasks.
+        - Extract "action": "update" or "delete".
+        - Extract "filter" with any of "status", "priority" and "due" ("overdue", "today", "none" or YYYY-MM-DD).
+        - For "update", extract the fields to set: "status", "priority", "due_date".
+
+        Multiple commands:
+        - If the input contains several independent commands (e.g. "add X, mark task 12 done and push Y to friday"),
+          return one entry per command in "commands", in the order the user gave them.
+        - Otherwise return a single entry.
+
         Allowed Values:
         Status: ["Pending", "In Progress", "Done"]
         Priority: ["Low", "Medium", "High"]
 
         Return STRICT JSON only:
         {{
-          "intent": "create|read|update|delete",
-          "data": {{
-              "title": "...",           // For create
-              "status": "...",          // For create/update
-              "priority": "...",        // For create/update
-              "due_date": "...",        // For create/update
-              "description": "...",     // For create
-              "target_task_name": "...",// For update/delete (if name used)
-              "target_task_id": 123,    // For update/delete (if ID used, int)
-              "new_title": "..."        // For update (renaming)
-          }}
+          "commands": [
+            {{
+              "intent": "create|read|update|delete|bulk",
+              "data": {{
+                  "title": "...",           // For create
+                  "status": "...",          // For create/update/bulk
+                  "priority": "...",        // For create/update/bulk
+                  "due_date": "...",        // For create/update/bulk
+                  "description": "...",     // For create
+                  "target_task_name": "...",// For update/delete (if name used)
+                  "target_task_id": 123,    // For update/delete (if ID used, int)
+                  "new_title": "...",       // For update (renaming)
+                  "action": "...",          // For bulk ("update" or "delete")
+                  "filter": {{"status": "...", "priority": "...", "due": "..."}} // For bulk
+              }}
+            }}
+          ]
         }}
 
         User input:
         {user_text}
         """
-        
-        for attempt in range(3):
-            try:
-                response = self.client.models.generate_content(
-                    model="gemini-2.5-flash",
-                    contents=prompt,
-                    config={
-                        "response_mime_type": "application/json"
-                    }
-                )
-                content = clean_json(response.text)
-                return json.loads(content)
-            except Exception as e:
-                logger.warning(f"AI Attempt {attempt+1} failed: {e}")
-                if attempt == 2:
-                    logger.error(f"Failed to process with AI after 3 attempts: {e}")
-                    raise e
-                time.sleep(1)
-        
-        return None
@@ -0,0 +1,208 @@
+import re
+from datetime import datetime, timedelta
+
+from src.config import Config
+from src.utils.dates import local_today
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+WEEKDAY_ABBR = {day[:3]: i for i, day in enumerate(WEEKDAYS)}
+STATUSES = {"pending": "Pending", "in progress": "In Progress", "done": "Done"}
+PRIORITIES = {"low": "Low", "medium": "Medium", "high": "High"}
+
+_ID = r"(?:task\s+|id\s+)?#?(?P<id>\d+)"
+_DATE = (
+    r"(?P<date>today|tonight|tomorrow|tmrw?|day after tomorrow"
+    r"|in\s+\d+\s+(?:days?|weeks?)"
+    r"|(?:next\s+|this\s+|on\s+)?(?:mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun)(?:day|nesday|urday|sday)?"
+    r"|\d{4}-\d{2}-\d{2})"
+)
+
+READ_RE = re.compile(
+    r"^(?:list|ls|tasks|todo|pending|read"
+    r"|(?:show|list|get|view)(?:\s+me)?(?:\s+(?:my|all|the))?(?:\s+(?:pending|open))?\s+tasks"
+    r"|what(?:'s|\s+is)\s+pending)$"
+)
+# "mark 12" alone could mean anything; only "mark 12 done" is a completion
+DONE_RE = re.compile(rf"^(?:(?:done|complete|finish|close)\s+{_ID}(?:\s+(?:as\s+)?done)?|mark\s+{_ID.replace('id>', 'id2>')}\s+(?:as\s+)?done)$")
+START_RE = re.compile(rf"^(?:start|begin)\s+{_ID}$")
+DELETE_RE = re.compile(rf"^(?:delete|remove|archive|del|rm)\s+{_ID}$")
+PRIORITY_RE = re.compile(
+    rf"^(?:set\s+)?(?:priority\s+(?:of\s+)?{_ID}\s+(?:to\s+)?(?P<p1>high|medium|low)"
+    rf"|{_ID.replace('id>', 'id2>')}\s+priority\s+(?:to\s+)?(?P<p2>high|medium|low))$"
+)
+STATUS_RE = re.compile(rf"^(?:set\s+)?(?:status\s+(?:of\s+)?)?{_ID}\s+(?:status\s+)?(?:to\s+)?(?P<status>pending|in progress|done)$")
+DUE_RE = re.compile(rf"^(?:move|push|postpone|reschedule|snooze|due)\s+{_ID}\s+(?:to\s+|until\s+|on\s+)?{_DATE}$")
+# A date is only split off the title after "due", "by" or "on": in "add read the sun"
+# or "add watch today" the last word belongs to the title. A bare "new" is not a
+# create verb either ("new york trip planning").
+CREATE_RE = re.compile(
+    rf"^(?:add|create|new task|todo:?)\s+(?P<title>.+?)"
+    rf"(?:\s+(?:priority\s+(?P<p1>high|medium|low)|(?P<p2>high|medium|low)\s+priority))?"
+    rf"(?:\s+(?:due|by|on)\s+{_DATE})?"
+    rf"(?:\s+(?:priority\s+(?P<p3>high|medium|low)|(?P<p4>high|medium|low)\s+priority))?$"
+)
+# "all overdue tasks", "every high priority task", "everything due today"
+_SELECTION = (
+    r"(?:(?:all(?:\s+(?:my|the))?|every)(?:\s+(?P<overdue>overdue))?"
+    r"(?:\s+(?P<sel_status>pending|in progress|done))?"
+    r"(?:\s+(?P<sel_priority>high|medium|low)(?:\s+priority)?)?\s+(?:tasks?|todos?)"
+    r"|everything(?:\s+(?P<overdue2>overdue))?)"
+    r"(?:\s+(?:due\s+(?P<due>today|tomorrow|\d{4}-\d{2}-\d{2})|(?P<no_due>without\s+(?:a\s+)?due\s+date)))?"
+)
+BULK_COMPLETE_RE = re.compile(rf"^(?:complete|finish|close)\s+{_SELECTION}$")
+BULK_STATUS_RE = re.compile(rf"^(?:mark|set|move)\s+{_SELECTION}\s+(?:as\s+|to\s+)?(?P<status>pending|in progress|done)$")
+BULK_DELETE_RE = re.compile(rf"^(?:delete|remove|archive|clear)\s+{_SELECTION}$")
+BULK_DUE_RE = re.compile(rf"^(?:move|push|postpone|reschedule|snooze)\s+{_SELECTION}\s+(?:to\s+|until\s+)?{_DATE}$")
+# A title ending in what looks like a date without "due"/"by"/"on" is ambiguous
+TRAILING_DATE_RE = re.compile(rf"\s{_DATE}$")
+# Anything that reads like several commands or extra detail is left to the LLM
+COMPLEX_RE = re.compile(r"[,;]|\band\b|\bthen\b|\balso\b|\bdescription\b")
+
+def parse_date(phrase, today=None):
+    """Turn a relative date phrase into YYYY-MM-DD, or None if unrecognised.
+
+    Weekday names (with or without "next"/"this"/"on") mean the next such day
+    strictly after today. Today is the date in REMINDER_TIMEZONE.
+    """
+    today = today or local_today(Config.REMINDER_TIMEZONE)
+    phrase = " ".join(phrase.lower().split())
+
+    if re.fullmatch(r"\d{4}-\d{2}-\d{2}", phrase):
+        try:
+            return datetime.strptime(phrase, "%Y-%m-%d").strftime("%Y-%m-%d")
+        except ValueError:
+            return None
+    if phrase in ("today", "tonight"):
+        return today.isoformat()
+    if phrase in ("tomorrow", "tmr", "tmrw"):
+        return (today + timedelta(days=1)).isoformat()
+    if phrase == "day after tomorrow":
+        return (today + timedelta(days=2)).isoformat()
+
+    match = re.fullmatch(r"in (\d+) (day|week)s?", phrase)
+    if match:
+        days = int(match.group(1)) * (7 if match.group(2) == "week" else 1)
+        return (today + timedelta(days=days)).isoformat()
+
+    match = re.fullmatch(r"(?:next |this |on )?([a-z]+)", phrase)
+    if match and match.group(1)[:3] in WEEKDAY_ABBR:
+        weekday = WEEKDAY_ABBR[match.group(1)[:3]]
+        ahead = (weekday - today.weekday()) % 7 or 7
+        return (today + timedelta(days=ahead)).isoformat()
+
+    return None
+
+def _result(intent, data):
+    return {"intent": intent, "data": data, "source": "fast_path"}
+
+def _selector(match, today):
+    """Bulk selector from a _SELECTION match, or None if it contradicts itself"""
+    selector = {}
+    if match.group("sel_status"):
+        selector["status"] = STATUSES[match.group("sel_status")]
+    if match.group("sel_priority"):
+        selector["priority"] = PRIORITIES[match.group("sel_priority")]
+    dues = []
+    if match.group("overdue") or match.group("overdue2"):
+        dues.append("overdue")
+    if match.group("due"):
+        dues.append("today" if match.group("due") == "today" else parse_date(match.group("due"), today))
+    if match.group("no_due"):
+        dues.append("none")
+    if len(dues) > 1 or None in dues:
+        return None
+    if dues:
+        selector["due"] = dues[0]
+    return selector
+
+def _bulk(match, today, action, **updates):
+    selector = _selector(match, today)
+    if selector is None:
+        return None
+    return _result("bulk", {"action": action, "filter": selector, **updates})
+
+def parse_fast(user_text, today=None):
+    """Rule-based parse of common commands.
+
+    Returns the same {"intent", "data"} shape as the LLM (plus
+    "source": "fast_path"), or None when the text is not a high-confidence
+    match and should go to Gemini.
+    """
+    original = " ".join(user_text.strip().rstrip(".!?").split())
+    text = original.lower()
+    if not text or len(text) > 120:
+        return None
+
+    if READ_RE.match(text):
+        return _result("read", {})
+
+    if COMPLEX_RE.search(text):
+        return None
+
+    match = BULK_COMPLETE_RE.match(text)
+    if match:
+        return _bulk(match, today, "update", status="Done")
+
+    match = BULK_STATUS_RE.match(text)
+    if match:
+        return _bulk(match, today, "update", status=STATUSES[match.group("status")])
+
+    match = BULK_DELETE_RE.match(text)
+    if match:
+        return _bulk(match, today, "delete")
+
+    match = BULK_DUE_RE.match(text)
+    if match:
+        due_date = parse_date(match.group("date"), today)
+        return _bulk(match, today, "update", due_date=due_date) if due_date else None
+
+    match = DONE_RE.match(text)
+    if match:
+        task_id = match.group("id") or match.group("id2")
+        return _result("update", {"target_task_id": int(task_id), "status": "Done"})
+
+    match = START_RE.match(text)
+    if match:
+        return _result("update", {"target_task_id": int(match.group("id")), "status": "In Progress"})
+
+    match = DELETE_RE.match(text)
+    if match:
+        return _result("delete", {"target_task_id": int(match.group("id"))})
+
+    match = PRIORITY_RE.match(text)
+    if match:
+        task_id = match.group("id") or match.group("id2")
+        priority = match.group("p1") or match.group("p2")
+        return _result("update", {"target_task_id": int(task_id), "priority": PRIORITIES[priority]})
+
+    match = STATUS_RE.match(text)
+    if match:
+        return _result("update", {"target_task_id": int(match.group("id")), "status": STATUSES[match.group("status")]})
+
+    match = DUE_RE.match(text)
+    if match:
+        due_date = parse_date(match.group("date"), today)
+        if due_date:
+            return _result("update", {"target_task_id": int(match.group("id")), "due_date": due_date})
+        return None
+
+    match = CREATE_RE.match(text)
+    if match:
+        # Keep the user's original casing for the title
+        start, end = match.span("title")
+        title = original[start:end] if len(original) == len(text) else match.group("title")
+        due_date = parse_date(match.group("date"), today) if match.group("date") else None
+        if not title or (match.group("date") and not due_date):
+            return None
+        if not match.group("date") and TRAILING_DATE_RE.search(match.group("title")):
+            return None
+        priority = match.group("p1") or match.group("p2") or match.group("p3") or match.group("p4")
+        return _result("create", {
+            "title": title,
+            "status": "Pending",
+            "priority": PRIORITIES[priority] if priority else "Medium",
+            "due_date": due_date,
+            "description": "",
+        })
+
+    return None
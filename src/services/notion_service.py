@@ -1,69 +1,390 @@
+import asyncio
+import json
+import time
 import httpx
-from notion_client import AsyncClient
 from src.config import Config
-from src.utils.logger import setup_logger
+from src.services.task import Task
+from src.services.task_index import normalize, similarity, trigrams
+from src.services.task_mirror import TaskMirror
+from src.utils.logger import set_trace, setup_logger
+from src.utils.metrics import NOTION_CONNECTIONS_OPENED, NOTION_RATE_LIMITED, NOTION_REQUEST_SECONDS, endpoint_template
+from src.utils.rate_limiter import AsyncRateLimiter
 
 logger = setup_logger(__name__)
 
+# Properties the bot reads and writes
+TASK_PROPERTIES = ("Name", "Status", "Priority", "Due Date", "ID")
+
+def retry_after_seconds(response, default=1.0):
+    """Seconds to wait according to a 429 response's Retry-After header"""
+    try:
+        return max(float(response.headers.get("Retry-After", default)), 0.0)
+    except ValueError:
+        return default
+
+def create_client():
+    """Pooled keep-alive client for the Notion API, shared by every service using it"""
+    return httpx.AsyncClient(
+        base_url=Config.NOTION_BASE_URL,
+        timeout=30.0,
+        limits=httpx.Limits(
+            max_connections=Config.NOTION_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.NOTION_MAX_KEEPALIVE,
+            keepalive_expiry=Config.NOTION_KEEPALIVE_EXPIRY,
+        ),
+        http2=Config.NOTION_HTTP2,
+    )
+
+def connection_stats(stats):
+    """Request counters plus how many requests reused an already open connection"""
+    requests = stats["requests"]
+    reused = max(requests - stats["connections_opened"], 0)
+    return {
+        **stats,
+        "reused": reused,
+        "reuse_ratio": round(reused / requests, 3) if requests else 0.0,
+    }
+
 class NotionService:
-    def __init__(self):
-        self.base_url = "https://api.notion.com/v1"
+    def __init__(self, notion_key=None, database_id=None, client=None, store=None, mirror=True, rate_limiter=None):
+        self.base_url = Config.NOTION_BASE_URL
         self.headers = {
-            "Authorization": f"Bearer {Config.NOTION_KEY}",
+            "Authorization": f"Bearer {notion_key or Config.NOTION_KEY}",
             "Notion-Version": "2022-06-28",
             "Content-Type": "application/json"
         }
-        self.database_id = Config.DATABASE_ID
-        self.timeout = 30.0
-        # Initialize SDK Client for CRUD operations
-        self.client = AsyncClient(auth=Config.NOTION_KEY)
+        self.database_id = database_id or Config.DATABASE_ID
+        # Shared pooled client, opened by start() and closed by close() unless passed in
+        self.client = client
+        self._owns_client = client is None
+        self.stats = {
+            "requests": 0,
+            "connections_opened": 0,
+            "http2_responses": 0,
+            "rate_limited": 0,
+            "coalesced": 0,
+        }
+        # One budget for every call this service makes (Notion allows ~3 req/s);
+        # pass a limiter to share the budget with other services on the same workspace
+        self.rate_limiter = rate_limiter or AsyncRateLimiter(Config.NOTION_RATE_LIMIT, Config.NOTION_RATE_BURST)
+        self._in_flight = {}
+        # Local copy of the database, kept fresh by incremental sync; `mirror=False` for one-off reads
+        self.mirror = TaskMirror(store, self.database_id) if Config.MIRROR_ENABLED and mirror else None
+        self.store = store  # StateStore the mirror is saved to and restored from, if any
+        self._restored = False
+        self._sync_lock = asyncio.Lock()
+        self._sync_task = None
+
+    async def start(self):
+        """Open the shared keep-alive connection pool"""
+        if self.client is None:
+            self.client = create_client()
+            logger.info("Notion client started (http2=%s, max_connections=%d)", Config.NOTION_HTTP2, Config.NOTION_MAX_CONNECTIONS)
+
+        if self.mirror is not None and self.store is not None and not self._restored:
+            self._restored = True
+            self.mirror.restore(*await self.store.load_snapshot(self.database_id))
+
+        if self.mirror is not None and Config.MIRROR_SYNC_INTERVAL and self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_loop())
+
+    async def close(self):
+        """Close the shared connection pool"""
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            self._sync_task = None
+
+        if self.client is not None and self._owns_client:
+            await self.client.aclose()
+            self.client = None
+            logger.info("Notion client closed. Connection stats: %s", self.get_connection_stats())
+
+    def get_connection_stats(self):
+        """Report how many requests reused an already open connection"""
+        return connection_stats(self.stats)
+
+    async def _trace(self, event, info):
+        # httpcore only emits connect_tcp when a new connection has to be opened
+        if event == "connection.connect_tcp.complete":
+            self.stats["connections_opened"] += 1
+            NOTION_CONNECTIONS_OPENED.inc()
+
+    def _is_read(self, method, endpoint):
+        return method == "GET" or (method == "POST" and endpoint.endswith("/query"))
 
     async def _request(self, method, endpoint, body=None):
-        url = f"{self.base_url}/{endpoint}"
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        """Send a request, sharing one network call between identical concurrent reads"""
+        if method not in ("GET", "POST", "PATCH", "DELETE"):
+            raise ValueError(f"Unsupported method: {method}")
+        if not self._is_read(method, endpoint):
+            return await self._send(method, endpoint, body)
+
+        key = (method, endpoint, json.dumps(body, sort_keys=True) if body else None)
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._send(method, endpoint, body))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget_in_flight(key, done))
+        else:
+            self.stats["coalesced"] += 1
+        # Shielded so one caller giving up does not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _forget_in_flight(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every caller went away
+            task.exception()
+
+    async def _send(self, method, endpoint, body=None):
+        """Send one request under the shared rate limit, retrying on 429"""
+        if self.client is None:
+            await self.start()
+
+        # Timed as a whole: rate-limit waits and 429 retries are part of the caller's latency
+        endpoint_label = endpoint_template(endpoint)
+        status = "error"
+        start = time.perf_counter()
+        try:
+            for attempt in range(Config.NOTION_MAX_RETRIES + 1):
+                await self.rate_limiter.acquire()
+                try:
+                    self.stats["requests"] += 1
+                    response = await self.client.request(
+                        method,
+                        f"/{endpoint}",
+                        headers=self.headers,
+                        json=body if method in ("POST", "PATCH") else None,
+                        extensions={"trace": self._trace},
+                    )
+                    status = str(response.status_code)
+                    if response.http_version == "HTTP/2":
+                        self.stats["http2_responses"] += 1
+
+                    if response.status_code == 429 and attempt < Config.NOTION_MAX_RETRIES:
+                        retry_after = retry_after_seconds(response)
+                        self.stats["rate_limited"] += 1
+                        NOTION_RATE_LIMITED.inc(endpoint_label)
+                        logger.warning("Notion rate limited %s %s, retrying in %gs", method, endpoint, retry_after)
+                        self.rate_limiter.pause(retry_after)
+                        continue
+
+                    response.raise_for_status()
+                    return response.json()
+                except httpx.HTTPStatusError as e:
+                    logger.error("HTTP Error %s: %s", e.response.status_code, e.response.text)
+                    raise e
+                except Exception as e:
+                    logger.error("Request Error: %s", e)
+                    raise e
+        finally:
+            NOTION_REQUEST_SECONDS.observe(time.perf_counter() - start, method, endpoint_label, status)
+
+    async def iter_query(self, filter=None, sorts=None, page_size=None, limit=None):
+        """Stream database query results page by page, following next_cursor.
+
+        The next page is requested while the caller is still handling the
+        current one, so rendering and fetching overlap.
+        """
+        endpoint = f"databases/{self.database_id}/query"
+        page_size = min(page_size or Config.NOTION_PAGE_SIZE, 100)
+        body = {"page_size": min(page_size, limit) if limit else page_size}
+        if filter:
+            body["filter"] = filter
+        if sorts:
+            body["sorts"] = sorts
+
+        fetched = 0
+        pending = asyncio.create_task(self._request("POST", endpoint, body))
+        try:
+            while pending is not None:
+                response = await pending
+                pending = None
+                results = response.get("results", [])
+                if limit:
+                    results = results[:limit - fetched]
+                fetched += len(results)
+
+                cursor = response.get("next_cursor")
+                if response.get("has_more") and cursor and not (limit and fetched >= limit):
+                    next_size = min(page_size, limit - fetched) if limit else page_size
+                    next_body = {**body, "start_cursor": cursor, "page_size": next_size}
+                    pending = asyncio.create_task(self._request("POST", endpoint, next_body))
+
+                if results:
+                    yield results
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def warm_up(self):
+        """Check the key and database, and load the tasks, before the first message needs them.
+
+        Raises if Notion rejects the key or can't find the database. Missing
+        task properties are only logged, since the bot can still partly work.
+        """
+        database, _ = await asyncio.gather(
+            self._request("GET", f"databases/{self.database_id}"),
+            self.sync(),
+        )
+        missing = [name for name in TASK_PROPERTIES if name not in database.get("properties", {})]
+        if missing:
+            logger.warning("Notion database %s has no %s properties", self.database_id, ", ".join(missing))
+
+    async def _sync_loop(self):
+        """Keep the mirror fresh in the background"""
+        set_trace()  # not part of the update that happened to open the workspace
+        while True:
             try:
-                if method == "GET":
-                    response = await client.get(url, headers=self.headers)
-                elif method == "POST":
-                    response = await client.post(url, headers=self.headers, json=body)
-                elif method == "PATCH":
-                    response = await client.patch(url, headers=self.headers, json=body)
-                elif method == "DELETE":
-                    # Notion uses PATCH/archived for delete, but if we ever need DELETE method
-                    response = await client.delete(url, headers=self.headers)
-                else:
-                    raise ValueError(f"Unsupported method: {method}")
-                
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPStatusError as e:
-                logger.error(f"HTTP Error {e.response.status_code}: {e.response.text}")
-                raise e
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"Request Error: {e}")
-                raise e
+                logger.warning("Background mirror sync failed: %s", e)
+            await asyncio.sleep(Config.MIRROR_SYNC_INTERVAL)
 
-    async def get_pending_tasks(self):
-        """Fetch all tasks that are not marked as Done"""
-        # Kept using httpx because SDK had issues with query
-        try:
-            body = {
-                "filter": {
-                    "property": "Status",
-                    "select": {
-                        "does_not_equal": "Done"
-                    }
+    async def sync(self):
+        """Bring the mirror up to date.
+
+        The first sync (and one every MIRROR_FULL_RESYNC_INTERVAL, to drop pages
+        archived elsewhere) loads the whole database; later syncs only ask for
+        pages edited on or after the watermark. Notion rounds last_edited_time
+        to the minute, so the boundary minute is re-fetched on purpose.
+        """
+        if self.mirror is None:
+            return
+        last_sync = self.mirror.last_sync
+        async with self._sync_lock:
+            # Another caller already synced while we waited for the lock
+            if self.mirror.last_sync != last_sync:
+                return
+
+            full = self.mirror.needs_full_sync(Config.MIRROR_FULL_RESYNC_INTERVAL)
+            filter = None
+            if not full:
+                filter = {
+                    "timestamp": "last_edited_time",
+                    "last_edited_time": {"on_or_after": self.mirror.watermark}
                 }
+
+            try:
+                tasks = []
+                async for results in self.iter_query(filter):
+                    tasks.extend(Task.from_page(page) for page in results)
+            except Exception as e:
+                logger.error("Error syncing task mirror: %s", e)
+                raise e
+            self.mirror.apply_sync(tasks, full=full)
+
+    async def _fresh_mirror(self):
+        """Return the mirror if it is (or can be made) fresh enough to serve reads"""
+        if self.mirror is None:
+            return None
+        if not self.mirror.is_fresh(Config.MIRROR_MAX_AGE):
+            try:
+                await self.sync()
+            except Exception:
+                return None
+        return self.mirror
+
+    def _remember(self, page):
+        """Parse a page Notion returned into a Task, and keep it in the mirror"""
+        if not page:
+            return None
+        task = Task.from_page(page)
+        if self.mirror is not None:
+            self.mirror.upsert(task)
+        return task
+
+    async def iter_pending_tasks(self, page_size=None, sorts=None, limit=None):
+        """Stream batches of Tasks that are not marked as Done"""
+        mirror = await self._fresh_mirror()
+        if mirror is not None:
+            tasks = mirror.pending(sorts)
+            if limit:
+                tasks = tasks[:limit]
+            page_size = page_size or Config.NOTION_PAGE_SIZE
+            for i in range(0, len(tasks), page_size):
+                yield tasks[i:i + page_size]
+            return
+
+        filter = {
+            "property": "Status",
+            "select": {
+                "does_not_equal": "Done"
             }
-            response = await self._request("POST", f"databases/{self.database_id}/query", body)
-            return response.get("results", [])
+        }
+        try:
+            async for results in self.iter_query(filter, sorts, page_size, limit):
+                yield [Task.from_page(page) for page in results]
         except Exception as e:
-            logger.error(f"Error fetching pending tasks: {e}")
+            logger.error("Error fetching pending tasks: %s", e)
             raise e
 
+    async def get_pending_tasks(self, page_size=None, sorts=None, limit=None):
+        """Fetch all tasks that are not marked as Done"""
+        tasks = []
+        async for results in self.iter_pending_tasks(page_size, sorts, limit):
+            tasks.extend(results)
+        return tasks
+
+    async def query_tasks(self, filter, sorts=None, limit=None):
+        """Tasks matching a Notion filter (at most `limit`), read with one (paginated) query"""
+        tasks = []
+        async for results in self.iter_query(filter, sorts, limit=limit):
+            tasks.extend(self._remember(page) for page in results)
+        return tasks
+
+    async def get_due_tasks(self, until):
+        """Tasks not marked as Done that are due on or before `until` (an ISO date), soonest first.
+
+        Answered from the mirror when possible, otherwise with one filtered query.
+        """
+        sorts = [{"property": "Due Date", "direction": "ascending"}]
+        mirror = await self._fresh_mirror()
+        if mirror is not None:
+            return [task for task in mirror.pending(sorts) if (task.due or "~")[:10] <= until]
+
+        filter = {
+            "and": [
+                {"property": "Status", "select": {"does_not_equal": "Done"}},
+                {"property": "Due Date", "date": {"on_or_before": until}},
+            ]
+        }
+        tasks = []
+        async for results in self.iter_query(filter, sorts):
+            tasks.extend(Task.from_page(page) for page in results)
+        return tasks
+
+    async def match_tasks(self, name, limit=5):
+        """Rank tasks by how well their title matches `name`.
+
+        Served from the mirror's trigram index when possible; otherwise falls
+        back to Notion's `title contains` filter and ranks those results locally.
+        Returns (score, task) pairs, best first.
+        """
+        mirror = await self._fresh_mirror()
+        if mirror is not None:
+            return mirror.search(name, limit)
+
+        results = await self._query_tasks_by_name(name)
+        query_grams = trigrams(normalize(name))
+        ranked = []
+        for page in results:
+            task = self._remember(page)
+            title = normalize(task.title)
+            score = 1.0 if title == normalize(name) else similarity(query_grams, trigrams(title))
+            ranked.append((score, task))
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        return ranked[:limit]
+
     async def find_task_by_name(self, name):
-        """Search for a task by name"""
-        # Kept using httpx because SDK had issues with query
+        """Search for a task by name, returning the best match"""
+        matches = await self.match_tasks(name, limit=1)
+        return matches[0][1] if matches else None
+
+    async def _query_tasks_by_name(self, name):
         try:
             body = {
                 "filter": {
@@ -74,14 +395,20 @@ class NotionService:
                 }
             }
             response = await self._request("POST", f"databases/{self.database_id}/query", body)
-            results = response.get("results", [])
-            return results[0] if results else None
+            return response.get("results", [])
         except Exception as e:
-            logger.error(f"Error finding task '{name}': {e}")
+            logger.error("Error finding task '%s': %s", name, e)
             raise e
 
     async def find_task_by_custom_id(self, task_id: int):
         """Search for a task by its Unique ID number"""
+        mirror = await self._fresh_mirror()
+        if mirror is not None:
+            task = mirror.get_by_unique_id(task_id)
+            if task:
+                return task
+            # Not mirrored yet (e.g. created elsewhere since the last sync)
+
         try:
             body = {
                 "filter": {
@@ -93,19 +420,36 @@ class NotionService:
             }
             response = await self._request("POST", f"databases/{self.database_id}/query", body)
             results = response.get("results", [])
-            return results[0] if results else None
+            return self._remember(results[0]) if results else None
         except Exception as e:
-            logger.error(f"Error finding task by ID {task_id}: {e}")
+            logger.error("Error finding task by ID %s: %s", task_id, e)
             raise e
 
     async def get_task_by_id(self, page_id):
         """Fetch a single task by its page ID"""
+        mirror = await self._fresh_mirror()
+        if mirror is not None:
+            task = mirror.get(page_id)
+            if task:
+                return task
+
         try:
-            return await self.client.pages.retrieve(page_id=page_id)
+            return self._remember(await self._request("GET", f"pages/{page_id}"))
         except Exception as e:
-            logger.error(f"Error fetching task by ID: {e}")
+            logger.error("Error fetching task by ID: %s", e)
             raise e
 
+    def get_cached_task(self, page_id, max_age=None):
+        """Last known copy of a task from the mirror, without any network call.
+
+        With `max_age`, only answer if the mirror synced within that many seconds.
+        """
+        if self.mirror is None:
+            return None
+        if max_age is not None and not self.mirror.is_fresh(max_age):
+            return None
+        return self.mirror.get(page_id)
+
     async def update_task(self, page_id, updates):
         """Update a task's properties"""
         properties = {}
@@ -124,9 +468,10 @@ class NotionService:
             properties["Name"] = {"title": [{"text": {"content": updates["new_title"]}}]}
 
         try:
-            return await self.client.pages.update(page_id=page_id, properties=properties)
+            result = await self._request("PATCH", f"pages/{page_id}", {"properties": properties})
+            return self._remember(result)
         except Exception as e:
-            logger.error(f"Error updating task: {e}")
+            logger.error("Error updating task: %s", e)
             raise e
 
     async def create_task(self, title, status="Pending", priority="Medium", description=None, due_date=None):
@@ -144,19 +489,23 @@ class NotionService:
             properties["Due Date"] = {"date": {"start": due_date}}
 
         try:
-            return await self.client.pages.create(
-                parent={"database_id": self.database_id},
-                properties=properties
-            )
+            body = {
+                "parent": {"database_id": self.database_id},
+                "properties": properties
+            }
+            result = await self._request("POST", "pages", body)
+            return self._remember(result)
         except Exception as e:
-            logger.error(f"Error creating task: {e}")
+            logger.error("Error creating task: %s", e)
             raise e
 
     async def delete_task(self, page_id):
         """Archive (delete) a task"""
         try:
-            await self.client.pages.update(page_id=page_id, archived=True)
+            await self._request("PATCH", f"pages/{page_id}", {"archived": True})
+            if self.mirror is not None:
+                self.mirror.remove(page_id)
             return True
         except Exception as e:
-            logger.error(f"Error deleting task: {e}")
+            logger.error("Error deleting task: %s", e)
             raise e
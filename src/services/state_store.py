@@ -0,0 +1,296 @@
+import asyncio
+import itertools
+import json
+import sqlite3
+import time
+from collections import deque
+
+from src.config import Config
+from src.services.task import Task
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed_updates (
+    update_id INTEGER PRIMARY KEY,
+    processed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pending_writes (
+    id INTEGER PRIMARY KEY,
+    database_id TEXT NOT NULL,
+    page_id TEXT NOT NULL,
+    updates TEXT NOT NULL,
+    snooze TEXT,
+    due_hint TEXT
+);
+CREATE TABLE IF NOT EXISTS task_snapshots (
+    database_id TEXT NOT NULL,
+    page_id TEXT NOT NULL,
+    page TEXT NOT NULL,
+    PRIMARY KEY (database_id, page_id)
+);
+CREATE TABLE IF NOT EXISTS mirror_state (
+    database_id TEXT PRIMARY KEY,
+    watermark TEXT
+);
+CREATE TABLE IF NOT EXISTS sent_reminders (
+    user_id INTEGER NOT NULL,
+    page_id TEXT NOT NULL,
+    due TEXT NOT NULL,
+    fire_at REAL NOT NULL,
+    PRIMARY KEY (user_id, page_id, due)
+);
+"""
+
+# How often expired update ids are deleted from the database
+PRUNE_INTERVAL = 3600
+
+CLEAR_SNAPSHOT = "DELETE FROM task_snapshots WHERE database_id = ?"
+
+class StateStore:
+    """Bot state kept across restarts in an embedded sqlite database (WAL mode).
+
+    Holds the update ids already handled (so a redelivered update is skipped),
+    task writes queued but not yet sent to Notion, each database's task
+    mirror, and the reminders already sent. Changes are collected in memory and committed in one transaction
+    every `commit_interval` seconds from a worker thread, so saving state never
+    delays a reply; a crash loses at most the last interval.
+    """
+
+    def __init__(self, path, commit_interval=None, retention=None):
+        self.path = path
+        self.commit_interval = commit_interval or Config.STATE_COMMIT_INTERVAL
+        self.retention = retention or Config.STATE_UPDATE_RETENTION
+        self._db = None
+        self._task = None
+        self._lock = asyncio.Lock()  # one transaction at a time
+        self._ops = []  # (sql, params) in the order they happened
+        self._tasks = {}  # (database id, page id) -> Task, or None to delete; latest wins
+        self._write_ids = None
+        # Recently handled update ids: a set for lookups, a deque to expire them in order
+        self._updates = set()
+        self._update_times = deque()
+        self._claimed = set()
+        self._last_prune = 0.0
+        self.stats = {"commits": 0, "statements": 0, "failed_commits": 0}
+
+    async def open(self):
+        """Open (or create) the database and load the recent update ids"""
+        if self._db is not None:
+            return
+        recent = await asyncio.to_thread(self._open)
+        now = time.time()
+        for update_id, processed_at in recent:
+            self._updates.add(update_id)
+            self._update_times.append((processed_at, update_id))
+        self._last_prune = now
+        self._task = asyncio.create_task(self._commit_loop())
+        logger.info("State store opened at %s (%d recent updates)", self.path, len(recent))
+
+    def _open(self):
+        db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")  # with WAL: a power cut may lose recent commits, never corrupts
+        db.executescript(SCHEMA)
+        cutoff = time.time() - self.retention
+        db.execute("DELETE FROM processed_updates WHERE processed_at < ?", (cutoff,))
+        recent = db.execute(
+            "SELECT update_id, processed_at FROM processed_updates ORDER BY processed_at"
+        ).fetchall()
+        next_id = db.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM pending_writes").fetchone()[0]
+        self._write_ids = itertools.count(next_id)
+        self._db = db
+        return recent
+
+    # Processed updates
+
+    def claim_update(self, update_id):
+        """False if the update was already handled (or is being handled) and should be skipped"""
+        if update_id in self._updates or update_id in self._claimed:
+            return False
+        self._claimed.add(update_id)
+        return True
+
+    def finish_update(self, update_id):
+        """Record a claimed update as handled; it is skipped if delivered again"""
+        self._claimed.discard(update_id)
+        now = time.time()
+        self._updates.add(update_id)
+        self._update_times.append((now, update_id))
+        while self._update_times and self._update_times[0][0] < now - self.retention:
+            self._updates.discard(self._update_times.popleft()[1])
+        self._ops.append(("INSERT OR REPLACE INTO processed_updates VALUES (?, ?)", (update_id, now)))
+
+    def release_update(self, update_id):
+        """Give up a claim without recording it, so a redelivery is handled"""
+        self._claimed.discard(update_id)
+
+    # Pending Notion writes
+
+    def add_write(self, database_id, page_id, updates, snooze=None, due_hint=None, has_hint=False):
+        """Save a queued write; returns its id for remove_writes()"""
+        if self._write_ids is None:
+            return None
+        write_id = next(self._write_ids)
+        self._ops.append((
+            "INSERT INTO pending_writes VALUES (?, ?, ?, ?, ?, ?)",
+            (write_id, database_id, page_id, json.dumps(updates),
+             json.dumps(snooze) if snooze else None,
+             json.dumps({"due": due_hint}) if has_hint else None),
+        ))
+        return write_id
+
+    def remove_writes(self, write_ids):
+        """Forget writes that were sent to Notion (or failed and were reported)"""
+        for write_id in write_ids:
+            if write_id is not None:
+                self._ops.append(("DELETE FROM pending_writes WHERE id = ?", (write_id,)))
+
+    async def load_writes(self, database_id):
+        """Writes for `database_id` left over from an earlier run, oldest first.
+
+        Returns (id, page id, updates, snooze step or None, {"due": hint} or None) tuples.
+        """
+        await self.flush()  # apply removals of writes that were sent since the last commit
+        rows = await self._read(
+            "SELECT id, page_id, updates, snooze, due_hint FROM pending_writes WHERE database_id = ? ORDER BY id",
+            (database_id,),
+        )
+        return [
+            (write_id, page_id, json.loads(updates),
+             tuple(json.loads(snooze)) if snooze else None,
+             json.loads(due_hint) if due_hint else None)
+            for write_id, page_id, updates, snooze, due_hint in rows
+        ]
+
+    async def pending_write_databases(self):
+        await self.flush()
+        rows = await self._read("SELECT DISTINCT database_id FROM pending_writes")
+        return {row[0] for row in rows}
+
+    # Task snapshots
+
+    def save_task(self, database_id, task):
+        self._tasks[(database_id, task.id)] = task
+
+    def delete_task(self, database_id, page_id):
+        self._tasks[(database_id, page_id)] = None
+
+    def replace_tasks(self, database_id, tasks, watermark):
+        """Replace a database's whole snapshot, after a full sync"""
+        for key in [key for key in self._tasks if key[0] == database_id]:
+            del self._tasks[key]
+        self._ops.append((CLEAR_SNAPSHOT, (database_id,)))
+        for task in tasks:
+            self._tasks[(database_id, task.id)] = task
+        self.save_watermark(database_id, watermark)
+
+    def save_watermark(self, database_id, watermark):
+        self._ops.append(("INSERT OR REPLACE INTO mirror_state VALUES (?, ?)", (database_id, watermark)))
+
+    async def load_snapshot(self, database_id):
+        """(tasks, watermark) saved for `database_id`, or ([], None)"""
+        await self.flush()  # include anything not committed yet
+        rows = await self._read("SELECT page FROM task_snapshots WHERE database_id = ?", (database_id,))
+        state = await self._read("SELECT watermark FROM mirror_state WHERE database_id = ?", (database_id,))
+        return [Task.from_dict(json.loads(row[0])) for row in rows], state[0][0] if state else None
+
+    # Sent reminders
+
+    def save_reminder(self, user_id, page_id, due, fire_at):
+        self._ops.append(("INSERT OR REPLACE INTO sent_reminders VALUES (?, ?, ?, ?)", (user_id, page_id, due, fire_at)))
+
+    def forget_reminders(self, before):
+        self._ops.append(("DELETE FROM sent_reminders WHERE fire_at < ?", (before,)))
+
+    async def load_reminders(self, since):
+        """{(user id, page id, due): fire time} of reminders sent at or after `since`"""
+        await self.flush()
+        rows = await self._read(
+            "SELECT user_id, page_id, due, fire_at FROM sent_reminders WHERE fire_at >= ?", (since,)
+        )
+        return {(user_id, page_id, due): fire_at for user_id, page_id, due, fire_at in rows}
+
+    # Committing
+
+    async def _read(self, sql, params=()):
+        if self._db is None:
+            return []
+        async with self._lock:
+            return await asyncio.to_thread(lambda: self._db.execute(sql, params).fetchall())
+
+    async def _commit_loop(self):
+        while True:
+            await asyncio.sleep(self.commit_interval)
+            await self.flush()
+
+    async def flush(self):
+        """Commit every change collected so far.
+
+        If the commit fails, the changes are kept and retried with the next one.
+        """
+        if self._db is None:
+            return
+        now = time.time()
+        if now - self._last_prune > PRUNE_INTERVAL:
+            self._last_prune = now
+            self._ops.append(("DELETE FROM processed_updates WHERE processed_at < ?", (now - self.retention,)))
+        if not self._ops and not self._tasks:
+            return
+        # Shielded so cancelling the commit loop never abandons a transaction half-way
+        await asyncio.shield(self._flush())
+
+    async def _flush(self):
+        async with self._lock:
+            ops, self._ops = self._ops, []
+            tasks, self._tasks = self._tasks, {}
+            if not ops and not tasks:
+                return
+            try:
+                await asyncio.to_thread(self._commit, ops, tasks)
+            except sqlite3.Error as e:
+                self.stats["failed_commits"] += 1
+                logger.error("Could not save state (%d changes kept for the next commit): %s", len(ops) + len(tasks), e)
+                self._restore(ops, tasks)
+                return
+            self.stats["commits"] += 1
+            self.stats["statements"] += len(ops) + len(tasks)
+
+    def _restore(self, ops, tasks):
+        """Put a failed batch back in front of the changes made since"""
+        cleared = {params[0] for sql, params in self._ops if sql == CLEAR_SNAPSHOT}
+        kept = {key: task for key, task in tasks.items() if key[0] not in cleared}
+        kept.update(self._tasks)  # newer snapshots win
+        self._ops = ops + self._ops
+        self._tasks = kept
+
+    def _commit(self, ops, tasks):
+        db = self._db
+        db.execute("BEGIN")
+        try:
+            for sql, params in ops:
+                db.execute(sql, params)
+            db.executemany(
+                "INSERT OR REPLACE INTO task_snapshots VALUES (?, ?, ?)",
+                [(database_id, page_id, json.dumps(task.to_dict()))
+                 for (database_id, page_id), task in tasks.items() if task is not None],
+            )
+            db.executemany(
+                "DELETE FROM task_snapshots WHERE database_id = ? AND page_id = ?",
+                [key for key, task in tasks.items() if task is None],
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+        if self._db is not None:
+            db, self._db = self._db, None
+            await asyncio.to_thread(db.close)
+            logger.info("State store closed. Stats: %s", self.stats)
@@ -0,0 +1,84 @@
+import sys
+from dataclasses import dataclass, fields, replace
+
+@dataclass(frozen=True, slots=True)
+class Task:
+    """A task as the bot sees it, parsed once from a Notion page.
+
+    Only the fields the bot shows, sorts and filters on are kept, as flat
+    strings, instead of the page's nested property JSON. Instances are
+    immutable: `changed()` returns an updated copy, so a task can be shared
+    by the mirror, stored lists and pending writes without being copied.
+    """
+
+    id: str
+    title: str = ""
+    status: str | None = None
+    priority: str | None = None
+    due: str | None = None  # Notion date start: "YYYY-MM-DD" or an ISO date-time
+    number: int | None = None  # unique ID number
+    prefix: str | None = None  # unique ID prefix, e.g. "T"
+    created: str | None = None  # created_time
+    edited: str | None = None  # last_edited_time
+    archived: bool = False
+
+    @classmethod
+    def from_page(cls, page):
+        """Parse a Notion page object (from a query, retrieve, create or update)"""
+        props = page.get("properties") or {}
+
+        title = ""
+        name = props.get("Name")
+        if name and name.get("title"):
+            title = "".join(
+                item["plain_text"] if "plain_text" in item else (item.get("text") or {}).get("content", "")
+                for item in name["title"]
+            )
+
+        due = props.get("Due Date")
+        due = due["date"].get("start") if due and due.get("date") else None
+        unique_id = props.get("ID")
+        unique_id = (unique_id.get("unique_id") or {}) if unique_id else {}
+
+        return cls(
+            page["id"],
+            title,
+            _select(props.get("Status")),
+            _select(props.get("Priority")),
+            sys.intern(due) if due else None,
+            unique_id.get("number"),
+            _intern(unique_id.get("prefix")),
+            page.get("created_time"),
+            page.get("last_edited_time"),
+            bool(page.get("archived") or page.get("in_trash")),
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        """Inverse of to_dict(); also accepts a full Notion page"""
+        if "properties" in data:
+            return cls.from_page(data)
+        return cls(**data)
+
+    def to_dict(self):
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+    @property
+    def unique_id(self):
+        """Display form of the unique ID ("T-12", or "12" without a prefix), or None"""
+        if self.number is None:
+            return None
+        return f"{self.prefix}-{self.number}" if self.prefix else str(self.number)
+
+    def changed(self, **changes):
+        """Copy with some fields replaced"""
+        return replace(self, **changes)
+
+def _intern(value):
+    # Statuses, priorities and prefixes repeat across every task: share one string
+    return sys.intern(value) if value else value
+
+def _select(prop):
+    if prop and prop.get("select"):
+        return _intern(prop["select"].get("name"))
+    return None
@@ -0,0 +1,129 @@
+import re
+from collections import Counter
+from itertools import islice
+import unicodedata
+
+_WORD_RE = re.compile(r"\w+")
+
+def normalize(text):
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+def trigrams(text):
+    """Word-level trigrams, so matching does not depend on word order"""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+def similarity(query_grams, title_grams):
+    """Dice coefficient of two trigram sets"""
+    if not query_grams or not title_grams:
+        return 0.0
+    return 2 * len(query_grams & title_grams) / (len(query_grams) + len(title_grams))
+
+class TaskIndex:
+    """Trigram index over task titles for ranked fuzzy lookup"""
+
+    # Posting lists longer than this share of the index are too common to
+    # narrow down candidates (think "  t"), so they are only used for scoring.
+    COMMON_GRAM_RATIO = 0.05
+    MAX_CANDIDATES = 50
+
+    def __init__(self):
+        self.titles = {}     # page_id -> normalized title
+        self.grams = {}      # page_id -> trigram set
+        self.postings = {}   # trigram -> set of page_ids
+
+    def __len__(self):
+        return len(self.titles)
+
+    def clear(self):
+        self.titles.clear()
+        self.grams.clear()
+        self.postings.clear()
+
+    def add(self, page_id, title):
+        normalized = normalize(title)
+        if self.titles.get(page_id) == normalized:
+            return
+        self.remove(page_id)
+        grams = trigrams(normalized)
+        self.titles[page_id] = normalized
+        self.grams[page_id] = grams
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(page_id)
+
+    def remove(self, page_id):
+        if page_id not in self.titles:
+            return
+        del self.titles[page_id]
+        for gram in self.grams.pop(page_id):
+            posting = self.postings.get(gram)
+            if posting is not None:
+                posting.discard(page_id)
+                if not posting:
+                    del self.postings[gram]
+
+    def search(self, query, limit=5):
+        """Return up to `limit` (score, page_id) pairs, best first"""
+        normalized = normalize(query)
+        query_grams = trigrams(normalized)
+        if not query_grams:
+            return []
+
+        postings = sorted(
+            (self.postings[gram] for gram in query_grams if gram in self.postings),
+            key=len,
+        )
+        if not postings:
+            return []
+
+        # Count shared rare trigrams per page (Counter.update runs in C) and
+        # only compute exact scores for the pages with the most hits. When
+        # every trigram is common, intersect posting lists to shrink the set.
+        common = max(50, int(len(self.titles) * self.COMMON_GRAM_RATIO))
+        hits = Counter()
+        for posting in postings:
+            if len(posting) > common:
+                break
+            hits.update(posting)
+
+        if hits:
+            candidates = [page_id for page_id, _ in hits.most_common(self.MAX_CANDIDATES)]
+        else:
+            candidates = postings[0]
+            for posting in postings[1:]:
+                if len(candidates) <= self.MAX_CANDIDATES:
+                    break
+                narrowed = candidates & posting
+                if narrowed:
+                    candidates = narrowed
+            candidates = islice(candidates, self.MAX_CANDIDATES)
+
+        scored = []
+        for page_id in candidates:
+            score = similarity(query_grams, self.grams[page_id])
+            title = self.titles[page_id]
+            if title == normalized:
+                score = 1.0
+            elif normalized in title:
+                # Whole-phrase containment beats an equally similar scatter of grams
+                score = min(score + 0.15, 0.99)
+            scored.append((score, page_id))
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[:limit]
+
+def is_ambiguous(matches, margin=0.1):
+    """True when the two best matches are too close to pick one"""
+    if len(matches) < 2:
+        return False
+    best, runner_up = matches[0][0], matches[1][0]
+    if best == 1.0 and runner_up < 1.0:
+        return False
+    return best - runner_up < margin
@@ -0,0 +1,144 @@
+import time
+from src.services.task_index import TaskIndex
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Notion property name -> Task field, for local sorting
+SORT_FIELDS = {"Name": "title", "Status": "status", "Priority": "priority", "Due Date": "due", "ID": "number"}
+
+class TaskMirror:
+    """Local copy of the task database as Tasks, keyed by page id and unique ID number.
+
+    With a StateStore, every change is also saved under `database_id`, and
+    restore() brings the copy back after a restart.
+    """
+
+    def __init__(self, store=None, database_id=None):
+        self.store = store
+        self.database_id = database_id
+        self.tasks = {}
+        self.by_unique_id = {}
+        self.index = TaskIndex()
+        self.watermark = None  # highest last_edited_time seen by a sync query
+        self.loaded = False
+        self.last_sync = 0.0
+        self.last_full_sync = 0.0
+
+    def age(self):
+        """Seconds since the last successful sync"""
+        return time.monotonic() - self.last_sync
+
+    def is_fresh(self, max_age):
+        return self.loaded and self.age() <= max_age
+
+    def needs_full_sync(self, interval):
+        """True before the first load and once the periodic full resync is due"""
+        if not self.loaded or self.watermark is None:
+            return True
+        return time.monotonic() - self.last_full_sync > interval
+
+    def upsert(self, task):
+        """Insert or replace a task, ignoring copies older than the one we hold"""
+        if task.archived:
+            self.remove(task.id)
+        elif self._put(task) and self.store is not None:
+            self.store.save_task(self.database_id, task)
+
+    def _put(self, task):
+        """Index a task locally; False if it is older than the copy we hold"""
+        current = self.tasks.get(task.id)
+        if current and (current.edited or "") > (task.edited or ""):
+            return False
+
+        if current and current.number is not None:
+            self.by_unique_id.pop(current.number, None)
+
+        self.tasks[task.id] = task
+        self.index.add(task.id, task.title)
+        if task.number is not None:
+            self.by_unique_id[task.number] = task.id
+        return True
+
+    def remove(self, page_id):
+        task = self.tasks.pop(page_id, None)
+        self.index.remove(page_id)
+        if task:
+            if task.number is not None and self.by_unique_id.get(task.number) == page_id:
+                del self.by_unique_id[task.number]
+            if self.store is not None:
+                self.store.delete_task(self.database_id, page_id)
+
+    def restore(self, tasks, watermark):
+        """Load a snapshot saved by an earlier run.
+
+        The copy counts as loaded but stale, so the first read runs an
+        incremental sync from the saved watermark instead of a full reload.
+        Ignored if a sync already loaded the database.
+        """
+        if self.loaded:
+            return
+        for task in tasks:
+            self._put(task)
+        self.watermark = watermark
+        self.loaded = bool(tasks) and watermark is not None
+        self.last_full_sync = time.monotonic()
+        if self.loaded:
+            logger.info("Task mirror restored: %d tasks, changes since %s still to sync", len(self.tasks), watermark)
+
+    def apply_sync(self, tasks, full=False):
+        """Merge the results of a sync query and advance the watermark"""
+        if full:
+            self.tasks = {}
+            self.by_unique_id = {}
+            self.index.clear()
+
+        for task in tasks:
+            if full:
+                if not task.archived:
+                    self._put(task)
+            else:
+                self.upsert(task)
+            if task.edited and (self.watermark is None or task.edited > self.watermark):
+                self.watermark = task.edited
+
+        if self.store is not None:
+            if full:
+                self.store.replace_tasks(self.database_id, list(self.tasks.values()), self.watermark)
+            elif tasks:
+                self.store.save_watermark(self.database_id, self.watermark)
+
+        now = time.monotonic()
+        self.last_sync = now
+        if full:
+            self.loaded = True
+            self.last_full_sync = now
+        if full or tasks:
+            logger.info("Task mirror synced (%s): %d changed, %d total", "full" if full else "incremental", len(tasks), len(self.tasks))
+
+    def get(self, page_id):
+        return self.tasks.get(page_id)
+
+    def get_by_unique_id(self, number):
+        page_id = self.by_unique_id.get(number)
+        return self.tasks.get(page_id) if page_id else None
+
+    def search(self, name, limit=5):
+        """Fuzzy title search, returning (score, task) pairs best first"""
+        return [(score, self.tasks[page_id]) for score, page_id in self.index.search(name, limit)]
+
+    def pending(self, sorts=None):
+        """All tasks not marked as Done, ordered by Notion-style sorts"""
+        tasks = [task for task in self.tasks.values() if task.status != "Done"]
+        # Apply sorts last-to-first so the first sort has the highest precedence
+        for sort in reversed(sorts or []):
+            field = SORT_FIELDS.get(sort.get("property"))
+            if not field:
+                continue
+            descending = sort.get("direction") == "descending"
+            present = [task for task in tasks if getattr(task, field) is not None]
+            missing = [task for task in tasks if getattr(task, field) is None]
+            present.sort(key=lambda task: getattr(task, field), reverse=descending)
+            # Tasks without a value go last, like Notion does
+            tasks = present + missing
+        return tasks
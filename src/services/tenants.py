@@ -0,0 +1,251 @@
+import asyncio
+import json
+import sqlite3
+from collections import OrderedDict
+
+from src.config import Config
+from src.services.notion_service import NotionService, connection_stats, create_client
+from src.services.write_buffer import WriteBuffer
+from src.utils.logger import setup_logger
+from src.utils.rate_limiter import AsyncRateLimiter
+
+logger = setup_logger(__name__)
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+class Tenant:
+    """One Telegram user and the Notion database their tasks live in"""
+    __slots__ = ("user_id", "notion_key", "database_id", "name")
+
+    def __init__(self, user_id, notion_key, database_id, name=None):
+        self.user_id = int(user_id)
+        self.notion_key = notion_key
+        self.database_id = database_id
+        self.name = name or str(user_id)
+
+def load_tenants(path):
+    """Read tenants from a JSON file or a sqlite database.
+
+    JSON: a list of {"user_id", "notion_key", "database_id", "name"} objects.
+    sqlite: a `tenants` table with the same columns.
+    """
+    if path.lower().endswith(SQLITE_SUFFIXES):
+        db = sqlite3.connect(path)
+        try:
+            rows = db.execute("SELECT user_id, notion_key, database_id, name FROM tenants").fetchall()
+        finally:
+            db.close()
+        return [Tenant(*row) for row in rows]
+
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    return [
+        Tenant(entry["user_id"], entry["notion_key"], entry["database_id"], entry.get("name"))
+        for entry in entries
+    ]
+
+class TenantRegistry:
+    """Who may use the bot, keyed by Telegram user id"""
+
+    def __init__(self, tenants):
+        self.tenants = {tenant.user_id: tenant for tenant in tenants}
+
+    @classmethod
+    def from_config(cls):
+        if Config.TENANTS_FILE:
+            registry = cls(load_tenants(Config.TENANTS_FILE))
+            logger.info("Loaded %d tenants from %s", len(registry), Config.TENANTS_FILE)
+            return registry
+        # Single-user deployment configured through the environment
+        return cls([Tenant(Config.AUTHORIZED_USER_ID, Config.NOTION_KEY, Config.DATABASE_ID)])
+
+    def get(self, user_id):
+        return self.tenants.get(user_id)
+
+    def __len__(self):
+        return len(self.tenants)
+
+class Workspace:
+    """The live services of one tenant"""
+    __slots__ = ("tenant", "notion_service", "write_buffer")
+
+    def __init__(self, tenant, client, store=None, rate_limiter=None):
+        self.tenant = tenant
+        self.notion_service = NotionService(
+            tenant.notion_key, tenant.database_id, client=client, store=store, rate_limiter=rate_limiter
+        )
+        self.write_buffer = WriteBuffer(self.notion_service, store=store)
+
+    async def close(self):
+        # Flush buffered writes before the service they go through stops syncing
+        await self.write_buffer.close()
+        await self.notion_service.close()
+
+class TenantPool:
+    """Lazily opened tenant workspaces, least recently used evicted first.
+
+    Idle tenants cost only their registry entry: a workspace (mirror, write
+    buffer, sync loop) exists only for the `max_active` most recent users.
+    All workspaces share one Notion connection pool, while each tenant keeps
+    its own rate limiter, so a busy tenant spends only its own Notion budget.
+    The limiter outlives the workspace: reads made without opening it, and
+    the workspace reopened after an eviction, draw on the same budget.
+
+    With a StateStore, workspaces save their mirror and queued writes to it,
+    and start() reopens the workspaces that still have writes to send.
+    """
+
+    def __init__(self, registry, max_active=None, store=None):
+        self.registry = registry
+        self.max_active = max_active or Config.TENANT_CACHE_SIZE
+        self.store = store
+        self.workspaces = OrderedDict()
+        self.client = None
+        self._opening = {}  # user id -> future of the workspace being opened
+        self._closing = {}  # user id -> task closing their evicted workspace
+        self._limiters = {}  # user id -> the tenant's Notion rate limiter
+        self.stats = {"opened": 0, "evicted": 0}
+        # Notion request counters of closed workspaces, for the shared client's reuse stats
+        self._closed_notion_stats = {}
+
+    async def start(self):
+        """Open the shared connection pool, and the workspace of a single-user deployment"""
+        if self.store is not None:
+            await self.store.open()
+        if self.client is None:
+            self.client = create_client()
+            if self.store is not None:
+                # Send writes left over from the last run
+                databases = await self.store.pending_write_databases()
+                for tenant in list(self.registry.tenants.values()):
+                    if tenant.database_id in databases:
+                        await self.get(tenant.user_id)
+        if len(self.registry) == 1:
+            # Start mirroring right away, as there is only one database to serve
+            await self.get(next(iter(self.registry.tenants)))
+
+    async def warm_up(self):
+        """start(), then check and load the single user's workspace so its first message is fast"""
+        await self.start()
+        if len(self.registry) == 1:
+            workspace = await self.get(next(iter(self.registry.tenants)))
+            await workspace.notion_service.warm_up()
+
+    def is_authorized(self, user_id):
+        return self.registry.get(user_id) is not None
+
+    def peek(self, user_id):
+        """The user's workspace if it is open, without opening it or marking it as used"""
+        return self.workspaces.get(user_id)
+
+    def rate_limiter(self, user_id):
+        """The Notion rate limiter every request for this user goes through"""
+        limiter = self._limiters.get(user_id)
+        if limiter is None:
+            limiter = self._limiters[user_id] = AsyncRateLimiter(Config.NOTION_RATE_LIMIT, Config.NOTION_RATE_BURST)
+        return limiter
+
+    def reader(self, user_id):
+        """NotionService for a few reads of the user's database, without opening their workspace.
+
+        The open workspace's service if there is one; otherwise a query-only
+        service on the shared client and the tenant's rate limiter (no mirror,
+        sync loop or write buffer), so background jobs never open or evict
+        workspaces. None if the user
+        is not a tenant or the pool hasn't started.
+        """
+        workspace = self.workspaces.get(user_id)
+        if workspace is not None:
+            return workspace.notion_service
+        tenant = self.registry.get(user_id)
+        if tenant is None or self.client is None:
+            return None
+        return NotionService(
+            tenant.notion_key, tenant.database_id, client=self.client, mirror=False,
+            rate_limiter=self.rate_limiter(user_id),
+        )
+
+    async def get(self, user_id):
+        """Workspace for `user_id`, or None if the user is not a tenant.
+
+        A workspace is only handed out once its saved writes are queued
+        again, so a new write to a page never overtakes an older one.
+        Concurrent callers for the same user share a single opening.
+        """
+        workspace = self.workspaces.get(user_id)
+        if workspace is not None:
+            self.workspaces.move_to_end(user_id)
+            return workspace
+
+        tenant = self.registry.get(user_id)
+        if tenant is None:
+            return None
+        if self.client is None:
+            await self.start()
+            if user_id in self.workspaces:  # start() opened it
+                return await self.get(user_id)
+
+        opening = self._opening.get(user_id)
+        if opening is not None:
+            return await asyncio.shield(opening)
+        opening = self._opening[user_id] = asyncio.get_running_loop().create_future()
+        try:
+            workspace = await self._open(tenant)
+        except BaseException as e:
+            opening.set_exception(e)
+            opening.exception()  # retrieved here, so it isn't reported when nobody else waited
+            raise
+        finally:
+            del self._opening[user_id]
+        opening.set_result(workspace)
+
+        self.workspaces[user_id] = workspace
+        self.stats["opened"] += 1
+        while len(self.workspaces) > self.max_active:
+            evicted_id, evicted = self.workspaces.popitem(last=False)
+            self.stats["evicted"] += 1
+            # Handlers still holding it keep working; it just stops syncing
+            task = asyncio.create_task(self._close_workspace(evicted))
+            self._closing[evicted_id] = task
+            task.add_done_callback(lambda done, uid=evicted_id: self._forget_closing(uid, done))
+        return workspace
+
+    def _forget_closing(self, user_id, task):
+        if self._closing.get(user_id) is task:
+            del self._closing[user_id]
+
+    async def _open(self, tenant):
+        # A workspace evicted moments ago may still be sending its writes;
+        # once it is closed, the store no longer lists them as pending
+        closing = self._closing.get(tenant.user_id)
+        if closing is not None:
+            await asyncio.gather(closing, return_exceptions=True)
+
+        workspace = Workspace(tenant, self.client, self.store, self.rate_limiter(tenant.user_id))
+        try:
+            await workspace.notion_service.start()
+            await workspace.write_buffer.restore()
+        except BaseException:
+            await workspace.close()
+            raise
+        return workspace
+
+    async def _close_workspace(self, workspace):
+        await workspace.close()
+        for key, value in workspace.notion_service.stats.items():
+            self._closed_notion_stats[key] = self._closed_notion_stats.get(key, 0) + value
+
+    async def close(self):
+        workspaces = list(self.workspaces.values())
+        self.workspaces.clear()
+        await asyncio.gather(
+            *(self._close_workspace(w) for w in workspaces), *self._closing.values(), return_exceptions=True
+        )
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+            if self._closed_notion_stats:
+                logger.info("Notion client closed. Connection stats: %s", connection_stats(self._closed_notion_stats))
+        if self.store is not None:
+            await self.store.close()
+        logger.info("Tenant pool closed. Stats: %s", self.stats)
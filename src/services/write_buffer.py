@@ -0,0 +1,216 @@
+import asyncio
+import contextlib
+
+from src.config import Config
+from src.utils.dates import apply_snooze
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Marks "no due-date hint supplied", as opposed to a hint that there is no due date
+UNKNOWN = object()
+
+def apply_updates(task, updates, snoozes=()):
+    """Return a copy of `task` with update_task-style changes applied locally"""
+    changes = {}
+    if updates.get("status"):
+        changes["status"] = updates["status"]
+    if updates.get("priority"):
+        changes["priority"] = updates["priority"]
+    due_date = updates.get("due_date")
+    if snoozes:
+        due_date = due_date or task.due
+        for step in snoozes:
+            due_date = apply_snooze(due_date, step)
+    if due_date:
+        changes["due"] = due_date
+    if updates.get("new_title"):
+        changes["title"] = updates["new_title"]
+    return task.changed(**changes) if changes else task
+
+class _PendingWrite:
+    __slots__ = ("updates", "snoozes", "due_hint", "futures", "timer", "saved", "task")
+
+    def __init__(self):
+        self.updates = {}
+        self.snoozes = []
+        self.due_hint = UNKNOWN
+        self.futures = []
+        self.timer = None
+        self.saved = []  # StateStore ids of the writes merged into this one
+        self.task = None  # the flush sending it, once started
+
+    def merge(self, updates, snooze, due_hint):
+        # An explicit due date replaces any snoozes queued before it
+        if updates.get("due_date"):
+            self.snoozes = []
+        self.updates.update(updates)
+        if snooze:
+            self.snoozes.append(snooze)
+        if self.due_hint is UNKNOWN:
+            self.due_hint = due_hint
+
+class WriteBuffer:
+    """Per-page write-behind buffer for task updates.
+
+    Updates to the same page that arrive within WRITE_COALESCE_WINDOW seconds
+    are merged into one update_task call (later values win; snoozes stack).
+    Writes to a page are applied in the order they were submitted, and
+    delete() archives a page only after the writes queued for it.
+
+    With a StateStore, queued writes are saved until Notion has them, and
+    restore() sends the ones an earlier run didn't get to.
+    """
+
+    def __init__(self, notion_service, window=None, store=None):
+        self.notion_service = notion_service
+        self.store = store
+        self.window = Config.WRITE_COALESCE_WINDOW if window is None else window
+        self.pending = {}
+        self.locks = {}
+        self._flushing = set()
+        self.in_flight = {}  # page_id -> entries being written, oldest first
+        self.stats = {"submitted": 0, "flushed": 0, "snooze_reads": 0}
+
+    def submit(self, page_id, updates=None, snooze=None, due_hint=UNKNOWN):
+        """Queue an update and return a future for the resulting Task.
+
+        `snooze` is a step from parse_snooze; `due_hint` is the due date the
+        caller already knows (e.g. from the keyboard), used to avoid a read.
+        """
+        saved = None
+        if self.store is not None:
+            saved = self.store.add_write(
+                self.notion_service.database_id, page_id, updates or {}, snooze,
+                None if due_hint is UNKNOWN else due_hint, has_hint=due_hint is not UNKNOWN,
+            )
+        return self._queue(page_id, updates, snooze, due_hint, saved)
+
+    def _queue(self, page_id, updates, snooze, due_hint, saved):
+        loop = asyncio.get_running_loop()
+        entry = self.pending.get(page_id)
+        if entry is None:
+            entry = self.pending[page_id] = _PendingWrite()
+            entry.timer = loop.call_later(self.window, self._start_flush, page_id)
+        entry.merge(updates or {}, snooze, due_hint)
+        entry.saved.append(saved)
+
+        future = loop.create_future()
+        entry.futures.append(future)
+        self.stats["submitted"] += 1
+        return future
+
+    async def restore(self):
+        """Queue the writes an earlier run saved but never sent"""
+        if self.store is None:
+            return
+        writes = await self.store.load_writes(self.notion_service.database_id)
+        for saved, page_id, updates, snooze, hint in writes:
+            future = self._queue(page_id, updates, snooze, hint["due"] if hint else UNKNOWN, saved)
+            # Nobody waits for these; failures are logged by _flush
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        if writes:
+            logger.info("Resending %d saved writes to %s", len(writes), self.notion_service.database_id)
+
+    def preview(self, page_id, task):
+        """Expected state of `task` once every queued and in-flight write lands"""
+        entries = self.in_flight.get(page_id, []) + ([self.pending[page_id]] if page_id in self.pending else [])
+        for entry in entries:
+            task = apply_updates(task, entry.updates, entry.snoozes)
+        return task
+
+    def _start_flush(self, page_id):
+        entry = self.pending.pop(page_id, None)
+        if entry is None:
+            return
+        if entry.timer is not None:
+            entry.timer.cancel()
+        self.in_flight.setdefault(page_id, []).append(entry)
+        task = entry.task = asyncio.create_task(self._flush(page_id, entry))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def _base_due_date(self, page_id, entry, slot):
+        """Current due date to snooze from, reading Notion only as a last resort.
+
+        Preference: a write we just made to this page, the mirror when it is
+        fresh, the caller's hint, and finally a page retrieve.
+        """
+        if slot[2] is not None:
+            return slot[2].due
+        task = self.notion_service.get_cached_task(page_id, max_age=Config.MIRROR_MAX_AGE)
+        if task:
+            return task.due
+        if entry.due_hint is not UNKNOWN:
+            return entry.due_hint
+        self.stats["snooze_reads"] += 1
+        task = await self.notion_service.get_task_by_id(page_id)
+        return task.due if task else None
+
+    @contextlib.asynccontextmanager
+    async def _page_lock(self, page_id):
+        # [lock, number of holders and waiters, last task written]; dropped once nobody needs it
+        slot = self.locks.setdefault(page_id, [asyncio.Lock(), 0, None])
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                yield slot
+        finally:
+            slot[1] -= 1
+            if slot[1] == 0:
+                self.locks.pop(page_id, None)
+
+    async def _flush(self, page_id, entry):
+        async with self._page_lock(page_id) as slot:
+            try:
+                updates = dict(entry.updates)
+                if entry.snoozes:
+                    due_date = updates.get("due_date") or await self._base_due_date(page_id, entry, slot)
+                    for step in entry.snoozes:
+                        due_date = apply_snooze(due_date, step)
+                    updates["due_date"] = due_date
+
+                result = await self.notion_service.update_task(page_id, updates)
+                slot[2] = result
+                self.stats["flushed"] += 1
+                if len(entry.futures) > 1:
+                    logger.info("Merged %d updates to %s into one write", len(entry.futures), page_id, extra={"sample": Config.LOG_SAMPLE_RATE})
+                for future in entry.futures:
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                logger.error("Error flushing writes for %s: %s", page_id, e)
+                for future in entry.futures:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                # Sent, or failed and reported (the button was rolled back): either way done
+                if self.store is not None:
+                    self.store.remove_writes(entry.saved)
+
+        entries = self.in_flight.get(page_id, [])
+        if entry in entries:
+            entries.remove(entry)
+        if not entries:
+            self.in_flight.pop(page_id, None)
+
+    async def delete(self, page_id):
+        """Archive a page once the writes queued for it have been sent.
+
+        Queued writes are flushed right away rather than dropped, so whoever
+        is waiting on them gets an answer, and none is left to be sent (or
+        resent after a restart) to the archived page.
+        """
+        self._start_flush(page_id)
+        flushes = [entry.task for entry in self.in_flight.get(page_id, [])]
+        await asyncio.gather(*flushes, return_exceptions=True)
+        async with self._page_lock(page_id):
+            await self.notion_service.delete_task(page_id)
+
+    async def close(self):
+        """Flush every queued write now and wait for all of them"""
+        for page_id in list(self.pending):
+            self._start_flush(page_id)
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
+        logger.info("Write buffer closed. Stats: %s", self.stats)
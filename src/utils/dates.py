@@ -0,0 +1,142 @@
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+WEEKDAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+def parse_snooze(spec):
+    """Parse a snooze amount such as "1d", "2 days", "3h" or "next monday".
+
+    Returns a step tuple: ("days", n), ("hours", n) or ("weekday", 0-6).
+    """
+    text = " ".join(str(spec).lower().split())
+    match = re.fullmatch(r"(\d+)\s*(d|day|days|h|hr|hrs|hour|hours)", text)
+    if match:
+        unit = "hours" if match.group(2).startswith("h") else "days"
+        return (unit, int(match.group(1)))
+
+    match = re.fullmatch(r"(?:next\s+)?([a-z]+)", text)
+    if match:
+        for index, name in enumerate(WEEKDAY_NAMES):
+            if name.lower().startswith(match.group(1)[:3]) and len(match.group(1)) >= 3:
+                return ("weekday", index)
+
+    raise ValueError(f"Invalid snooze amount: {spec!r}")
+
+def snooze_label(step):
+    """Short button label for a snooze step"""
+    unit, amount = step
+    if unit == "days":
+        return "+1 Day" if amount == 1 else f"+{amount} Days"
+    if unit == "hours":
+        return f"+{amount}h"
+    return f"→ {WEEKDAY_NAMES[amount][:3]}"
+
+def snooze_description(step):
+    unit, amount = step
+    if unit == "days":
+        return "by 1 day" if amount == 1 else f"by {amount} days"
+    if unit == "hours":
+        return "by 1 hour" if amount == 1 else f"by {amount} hours"
+    return f"to next {WEEKDAY_NAMES[amount]}"
+
+def _parse_notion_date(value):
+    """Notion date start -> date or aware datetime"""
+    if len(value) <= 10:
+        return date.fromisoformat(value)
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def _format_notion_date(value):
+    if isinstance(value, datetime):
+        return value.isoformat(timespec="minutes")
+    return value.isoformat()
+
+def apply_snooze(current_date, step, now=None):
+    """Move a Notion date string by one snooze step.
+
+    Without a current date, days count from today (like the original +1 Day
+    button). Hour snoozes produce a date-time; weekday snoozes go to the next
+    such day after both today and the current date.
+    """
+    now = now or datetime.now(timezone.utc)
+    unit, amount = step
+    current = _parse_notion_date(current_date) if current_date else None
+
+    if unit == "days":
+        return _format_notion_date((current or now.date()) + timedelta(days=amount))
+
+    if unit == "hours":
+        if isinstance(current, datetime):
+            base = max(current, now)
+        elif current is not None and current > now.date():
+            base = datetime.combine(current, datetime.min.time(), tzinfo=timezone.utc)
+        else:
+            base = now
+        return _format_notion_date(base.replace(second=0, microsecond=0) + timedelta(hours=amount))
+
+    start = max(current.date() if isinstance(current, datetime) else (current or now.date()), now.date())
+    ahead = (amount - start.weekday()) % 7 or 7
+    return _format_notion_date(start + timedelta(days=ahead))
+
+def encode_due(current_date):
+    """Compact due-date hint for callback data: "n" (none), "d20261020", or "t<base36 epoch>"."""
+    if not current_date:
+        return "n"
+    parsed = _parse_notion_date(current_date)
+    if isinstance(parsed, datetime):
+        return "t" + _base36(int(parsed.timestamp()))
+    return "d" + parsed.strftime("%Y%m%d")
+
+def decode_due(hint):
+    """Inverse of encode_due; returns a Notion date string or None"""
+    if hint == "n":
+        return None
+    if hint.startswith("d"):
+        return datetime.strptime(hint[1:], "%Y%m%d").date().isoformat()
+    if hint.startswith("t"):
+        moment = datetime.fromtimestamp(int(hint[1:], 36), tz=timezone.utc)
+        return _format_notion_date(moment)
+    raise ValueError(f"Invalid due-date hint: {hint!r}")
+
+def _base36(number):
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    out = ""
+    while True:
+        number, rem = divmod(number, 36)
+        out = digits[rem] + out
+        if not number:
+            return out
+
+def parse_clock(spec):
+    """Parse a time of day such as "09:00" or "7:30" into a datetime.time"""
+    match = re.fullmatch(r"(\d{1,2}):(\d{2})", str(spec).strip())
+    if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+        raise ValueError(f"Invalid time of day: {spec!r} (expected HH:MM)")
+    return time(int(match.group(1)), int(match.group(2)))
+
+def due_timestamp(due_date, tz, at):
+    """Epoch seconds a Notion due date falls at.
+
+    A date-time is taken as is; a plain date means time of day `at` in `tz`.
+    """
+    parsed = _parse_notion_date(due_date)
+    if not isinstance(parsed, datetime):
+        parsed = datetime.combine(parsed, at, tzinfo=tz)
+    return parsed.timestamp()
+
+def local_today(tz_name):
+    """Today's date in the named timezone.
+
+    Called with REMINDER_TIMEZONE everywhere the bot reads "today", so the
+    parser, bulk selectors and reminders all agree around midnight.
+    """
+    return datetime.now(ZoneInfo(tz_name)).date()
+
+def next_daily(at, tz, now):
+    """Epoch seconds of the next time of day `at` in `tz` after epoch `now`"""
+    local = datetime.fromtimestamp(now, tz)
+    moment = datetime.combine(local.date(), at, tzinfo=tz)
+    if moment.timestamp() <= now:
+        moment = datetime.combine(local.date() + timedelta(days=1), at, tzinfo=tz)
+    return moment.timestamp()
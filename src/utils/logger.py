@@ -1,13 +1,151 @@
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import sys
 
+from src.config import Config
+
+# Correlation ids for the update being handled. Tasks started while handling it
+# (background writes, syncs) copy the context and keep the same ids.
+trace_id = contextvars.ContextVar("trace_id", default=None)
+trace_user = contextvars.ContextVar("trace_user", default=None)
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "sample"}
+
+_handler = None
+_listener = None
+
+def set_trace(update_id=None, user_id=None):
+    """Tag log lines written from the current task (and tasks it starts) with an update and user"""
+    trace_id.set(f"u{update_id}" if update_id is not None else None)
+    trace_user.set(user_id)
+
+class ContextFilter(logging.Filter):
+    """Stamps records with the trace ids and drops sampled-out lines.
+
+    A call can ask to be sampled with `extra={"sample": 0.1}` (keep one in ten),
+    for lines written on every request.
+    """
+
+    def filter(self, record):
+        sample = getattr(record, "sample", None)
+        if sample is not None and random.random() >= sample:
+            return False
+        record.trace_id = trace_id.get()
+        record.user_id = trace_user.get()
+        return True
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread and never blocks.
+
+    The stock handler formats every record in the caller before queueing it;
+    here the message is only built when it's written. When the queue is full
+    (stdout can't keep up) records are dropped and counted instead of stalling
+    the event loop.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, trace ids and any `extra` fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "trace_id", None):
+            entry["trace_id"] = record.trace_id
+        if getattr(record, "user_id", None):
+            entry["user_id"] = record.user_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key not in entry and key not in ("trace_id", "user_id"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    def formatMessage(self, record):
+        line = super().formatMessage(record)
+        if getattr(record, "trace_id", None):
+            line = f"{line} [{record.trace_id}]"
+        return line
+
+def parse_levels(spec):
+    """Parse "src.services=DEBUG,httpx=WARNING" into {logger name: level}"""
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.strip().partition("=")
+        if not sep:
+            continue
+        level = level.strip().upper()
+        if not isinstance(logging.getLevelName(level), int):
+            raise ValueError(f"Unknown log level {level!r} for {name.strip()!r}")
+        levels[name.strip()] = level
+    return levels
+
+def configure_logging():
+    """Route every logger through one queue to a background writer thread.
+
+    Called once, by the first setup_logger(). Lines from the bot ("src.*")
+    are written at LOG_LEVEL and anything else (telegram, httpx) at WARNING,
+    unless LOG_LEVELS says otherwise.
+    """
+    global _handler, _listener
+    if _handler is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if Config.LOG_FORMAT == "json" else TextFormatter())
+    log_queue = queue.Queue(Config.LOG_QUEUE_SIZE)
+    _handler = LazyQueueHandler(log_queue)
+    _handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(logging.WARNING)
+    logging.getLogger("src").setLevel(Config.LOG_LEVEL.upper())
+    for name, level in parse_levels(Config.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging():
+    """Write out everything still queued and stop the writer thread"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    if _handler.dropped:
+        sys.stderr.write(f"{_handler.dropped} log lines were dropped because the log queue was full\n")
+
 def setup_logger(name=__name__):
-    logger = logging.getLogger(name)
-    if not logger.handlers:
-        logger.setLevel(logging.INFO)
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.INFO)
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
-    return logger
+    configure_logging()
+    if name == "__main__":
+        name = "src.main"  # `python -m src.main`
+    return logging.getLogger(name)
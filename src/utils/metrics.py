@@ -0,0 +1,186 @@
+import asyncio
+from bisect import bisect_left
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Upper bounds in seconds; the last bucket (+Inf) catches everything else
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _label_text(names, values, extra=""):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """Monotonic count per label combination. Label values are passed positionally."""
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def inc(self, *label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        for values, count in self.values.items():
+            yield f"{self.name}{_label_text(self.labels, values)} {count}"
+
+class _Series:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+class Histogram:
+    """Latency distribution per label combination, in fixed buckets"""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, value, *label_values):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = _Series(len(self.buckets) + 1)
+        series.counts[bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+
+    def quantile(self, q, *label_values):
+        """Estimate a quantile by interpolating within its bucket"""
+        series = self.series.get(label_values)
+        if series is None or not series.count:
+            return None
+        rank = q * series.count
+        seen = 0
+        for index, count in enumerate(series.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def render(self):
+        for values, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series.counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_label_text(self.labels, values, le)} {cumulative}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_label_text(self.labels, values, le)} {series.count}"
+            yield f"{self.name}_sum{_label_text(self.labels, values)} {series.sum:.6f}"
+            yield f"{self.name}_count{_label_text(self.labels, values)} {series.count}"
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+
+    def counter(self, name, help_text, labels=()):
+        return self.metrics.setdefault(name, Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.metrics.setdefault(name, Histogram(name, help_text, labels, buckets))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """One line per histogram series with count and p50/p95/p99, for logs"""
+        lines = []
+        for metric in self.metrics.values():
+            if metric.kind != "histogram":
+                continue
+            for values, series in metric.series.items():
+                quantiles = " ".join(
+                    f"p{int(q * 100)}={metric.quantile(q, *values) * 1000:.0f}ms" for q in (0.5, 0.95, 0.99)
+                )
+                lines.append(f"{metric.name}{_label_text(metric.labels, values)} n={series.count} {quantiles}")
+        return lines
+
+REGISTRY = MetricsRegistry()
+
+AI_PARSE_SECONDS = REGISTRY.histogram(
+    "bot_ai_parse_seconds", "Time to turn a message into commands", ("source", "intent", "outcome")
+)
+NOTION_REQUEST_SECONDS = REGISTRY.histogram(
+    "bot_notion_request_seconds", "Notion API request time, rate-limit wait included", ("method", "endpoint", "status")
+)
+NOTION_CONNECTIONS_OPENED = REGISTRY.counter(
+    "bot_notion_connections_opened_total", "New connections opened to Notion (the rest reused a pooled one)"
+)
+NOTION_RATE_LIMITED = REGISTRY.counter(
+    "bot_notion_rate_limited_total", "Notion 429 responses", ("endpoint",)
+)
+TELEGRAM_SEND_SECONDS = REGISTRY.histogram(
+    "bot_telegram_send_seconds", "Telegram Bot API call time, excluding queueing", ("method", "outcome")
+)
+UPDATE_SECONDS = REGISTRY.histogram(
+    "bot_update_seconds", "Time from an update being handled to its handler finishing", ("handler", "intent", "outcome")
+)
+
+INTENTS = ("read", "create", "update", "delete", "bulk")
+
+def intent_label(commands):
+    """Label for a parse result: its intent, "multi" for several commands, "none" for nothing"""
+    if not commands:
+        return "none"
+    if len(commands) > 1:
+        return "multi"
+    intent = commands[0].get("intent")
+    return intent if intent in INTENTS else "other"
+
+def endpoint_template(endpoint):
+    """Collapse ids in a Notion endpoint so it can be used as a label"""
+    parts = endpoint.split("/")
+    if len(parts) > 1 and parts[0] in ("pages", "databases", "blocks"):
+        parts[1] = "{id}"
+    return "/".join(parts)
+
+def metrics_app():
+    """aiohttp application serving GET /metrics"""
+    from aiohttp import web  # only needed when metrics are served
+
+    async def handle_metrics(request):
+        return web.Response(text=REGISTRY.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    return app
+
+async def serve_metrics(host, port):
+    """Serve /metrics on its own port, in polling and webhook mode; returns the runner to clean up"""
+    from aiohttp import web
+
+    runner = web.AppRunner(metrics_app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info("Metrics available on http://%s:%s/metrics", host, port)
+    return runner
+
+async def log_metrics(interval):
+    """Log a latency summary every `interval` seconds"""
+    while True:
+        await asyncio.sleep(interval)
+        for line in REGISTRY.summary():
+            logger.info(line)
@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now):
+        """Seconds until one token is available (0 if one is available now)"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+class AsyncRateLimiter:
+    """Token bucket that callers await; waiters are served in arrival order"""
+
+    def __init__(self, rate, burst):
+        self.bucket = TokenBucket(rate, burst)
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a request may be sent"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                delay = max(self.paused_until - now, self.bucket.delay(now))
+                if delay <= 0:
+                    self.bucket.take(now)
+                    return
+                await asyncio.sleep(delay)
+
+    def pause(self, seconds):
+        """Hold every caller back for `seconds` (e.g. after a 429 Retry-After)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)